@@ -0,0 +1,69 @@
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.db import DatabaseCache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+
+from api import metrics
+from api.cache import is_shared_cache
+from users.models import User
+
+
+def token_cache_key(key: str) -> str:
+    return f'auth-token:{key}'
+
+
+def use_token_cache() -> bool:
+    """Нужен ли кэш токенов.
+
+    Кэш в памяти процесса не подходит (см. `CachedTokenAuthentication`),
+    а `DatabaseCache` сам делает запрос к БД и ничего не экономит.
+    """
+    return is_shared_cache() and not isinstance(
+        caches[DEFAULT_CACHE_ALIAS],
+        DatabaseCache,
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кэшированием пары токен-пользователь.
+
+    Запись живет `TOKEN_CACHE_TIMEOUT` секунд и удаляется сигналами при
+    удалении токена (в том числе при выходе через djoser), смене пароля
+    или деактивации пользователя. Удаление должно дойти до всех воркеров,
+    поэтому с кэшем в памяти процесса токен каждый раз проверяется по БД.
+    Токен, уже проверенный `ReplicaRoutingMiddleware`, повторно не
+    проверяется.
+    """
+
+    def authenticate(self, request: Request) -> Optional[Tuple[User, Token]]:
+        token_auth = getattr(request._request, 'token_auth', None)
+        if token_auth is not None:
+            return token_auth
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key: str) -> Tuple[User, Token]:
+        """Поиск пользователя по токену сначала в кэше, затем в БД.
+
+        Args:
+            key: Ключ токена из заголовка `Authorization`.
+
+        Returns:
+            Пользователь и его токен.
+
+        """
+        if not use_token_cache():
+            return super().authenticate_credentials(key)
+        token = cache.get(token_cache_key(key))
+        metrics.record_cache('token', token is not None)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(
+                token_cache_key(key),
+                token,
+                settings.TOKEN_CACHE_TIMEOUT,
+            )
+        return token.user, token
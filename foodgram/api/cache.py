@@ -0,0 +1,165 @@
+import random
+import secrets
+import time
+from typing import Any, Callable, Iterable
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from api import metrics
+from api.constant import (
+    CACHE_JITTER,
+    CACHE_LOCK_TIMEOUT,
+    CACHE_LOCK_WAIT,
+    CACHE_NEGATIVE_TIMEOUT,
+    CACHE_STALE_TIMEOUT,
+    CACHE_TIMEOUT,
+)
+
+LOCK_POLL_INTERVAL = 0.05
+
+
+def is_shared_cache(alias: str = DEFAULT_CACHE_ALIAS) -> bool:
+    """Видят ли записи кэша все процессы сервиса.
+
+    `LocMemCache` у каждого процесса свой, поэтому удаление записи в
+    одном воркере не доходит до остальных.
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+def version_key(namespace: str) -> str:
+    return f'version:{namespace}'
+
+
+def get_versions(namespaces: Iterable[str]) -> str:
+    """Текущие версии пространств имен кэша одной строкой.
+
+    Версия входит в ключи закэшированных значений, поэтому после ее
+    увеличения старые значения больше не читаются и истекают сами.
+    Новая версия начинается с текущего времени в наносекундах: если ключ
+    версии вытеснен из кэша, она не совпадет ни с одной из прежних.
+    """
+    return ':'.join(
+        str(cache.get_or_set(version_key(namespace), time.time_ns, None))
+        for namespace in namespaces
+    )
+
+
+def bump_version(*namespaces: str) -> None:
+    """Смена версий пространств имен кэша.
+
+    Версия заменяется текущим временем через `set`, а не `incr`: в
+    `DatabaseCache` `incr` не атомарен и одновременные увеличения
+    сливались бы в одно. При одновременной смене версия все равно
+    отличается от прежней, а для инвалидации этого достаточно.
+    """
+    for namespace in namespaces:
+        key = version_key(namespace)
+        cache.set(key, max(time.time_ns(), (cache.get(key) or 0) + 1), None)
+
+
+def bump_version_on_commit(*namespaces: str) -> None:
+    """Увеличение версий после коммита текущей транзакции.
+
+    Иначе конкурентный запрос может успеть закэшировать еще не
+    измененные данные под новой версией.
+    """
+    transaction.on_commit(lambda: bump_version(*namespaces))
+
+
+def store(key: str, value: Any, timeout: int) -> Any:
+    """Сохранение значения в конверте со временем свежести.
+
+    Время свежести случайно сдвигается на `CACHE_JITTER`, чтобы ключи,
+    записанные одновременно, не истекали одновременно. Пустое значение
+    (None) хранится `CACHE_NEGATIVE_TIMEOUT` секунд.
+    """
+    if value is None:
+        timeout = CACHE_NEGATIVE_TIMEOUT
+    fresh = timeout * random.uniform(1 - CACHE_JITTER, 1 + CACHE_JITTER)
+    cache.set(
+        key,
+        (time.time() + fresh, value),
+        fresh + CACHE_STALE_TIMEOUT,
+    )
+    return value
+
+
+def rebuild(key: str, build: Callable[[], Any], timeout: int):
+    """Сборка значения под блокировкой.
+
+    Под блокировкой значение проверяется повторно: его мог собрать
+    запрос, только что освободивший блокировку. В блокировке хранится
+    случайный токен, и она снимается, только если токен совпадает:
+    после `CACHE_LOCK_TIMEOUT` блокировкой может владеть другой запрос.
+
+    Returns:
+        Кортеж из собранного значения или None, если блокировка занята
+        другим запросом.
+
+    """
+    lock = f'{key}:lock'
+    token = secrets.token_hex(8)
+    if not cache.add(lock, token, CACHE_LOCK_TIMEOUT):
+        return None
+    try:
+        envelope = cache.get(key)
+        if envelope is not None and envelope[0] > time.time():
+            return (envelope[1],)
+        return (store(key, build(), timeout),)
+    finally:
+        if cache.get(lock) == token:
+            cache.delete(lock)
+
+
+def cached(
+    key: str,
+    build: Callable[[], Any],
+    timeout: int = CACHE_TIMEOUT,
+    namespaces: Iterable[str] = (),
+    name: str = 'default',
+) -> Any:
+    """Значение из кэша с защитой от одновременной пересборки.
+
+    Пересобирает значение только запрос, получивший блокировку
+    `cache.add`. Пока идет пересборка, остальные запросы получают
+    устаревшее значение, а если его нет - ждут до `CACHE_LOCK_WAIT`
+    секунд и только потом собирают значение сами.
+
+    Args:
+        key: Ключ значения.
+        build: Функция сборки значения, None означает отсутствие объекта.
+        timeout: Время свежести значения в секундах.
+        namespaces: Пространства имен, версии которых входят в ключ.
+        name: Название кэша для метрик.
+
+    Returns:
+        Значение из кэша или результат `build`.
+
+    """
+    if namespaces:
+        key = f'{key}:{get_versions(namespaces)}'
+    envelope = cache.get(key)
+    metrics.record_cache(
+        name,
+        envelope is not None and envelope[0] > time.time(),
+    )
+    if envelope is not None:
+        if envelope[0] > time.time():
+            return envelope[1]
+        result = rebuild(key, build, timeout)
+        return envelope[1] if result is None else result[0]
+    deadline = time.monotonic() + CACHE_LOCK_WAIT
+    while True:
+        result = rebuild(key, build, timeout)
+        if result is not None:
+            return result[0]
+        envelope = cache.get(key)
+        if envelope is not None:
+            return envelope[1]
+        if time.monotonic() > deadline:
+            return store(key, build(), timeout)
+        time.sleep(LOCK_POLL_INTERVAL)
@@ -4,3 +4,27 @@ MIN_VALUE = 1
 MAX_VALUE = 400
 MAX_LENGTH_USER = 150
 MAX_LENGTH_EMAIL = 254
+FEED_FANOUT_LIMIT = 10000
+FEED_BATCH_SIZE = 1000
+FEED_BACKFILL = 50
+FEED_PAGE_SIZE = 10
+FEED_MAX_PAGE_SIZE = 100
+PANTRY_MAX_MISSING = 5
+PANTRY_MAX_CHANGES = 1000
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_HORIZON_DAYS = 7
+TRENDING_FAVORITE_WEIGHT = 1.0
+TRENDING_CART_WEIGHT = 0.5
+COUNT_CACHE_TIMEOUT = 300
+COUNT_ESTIMATE_THRESHOLD = 100000
+DOCUMENT_BATCH_SIZE = 500
+CONCURRENCY_RETRY_AFTER = 1
+CACHE_TIMEOUT = 300
+CACHE_STALE_TIMEOUT = 60
+CACHE_NEGATIVE_TIMEOUT = 30
+CACHE_JITTER = 0.1
+CACHE_LOCK_TIMEOUT = 30
+CACHE_LOCK_WAIT = 2
+USERS_PAGE_SIZE = 10
+USERS_MAX_PAGE_SIZE = 100
+RECIPE_IDS_MAX = 100
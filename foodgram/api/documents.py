@@ -0,0 +1,350 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, QuerySet, Subquery
+from django.db.models.functions import JSONObject
+from django.utils import timezone
+from rest_framework.request import Request
+
+from api.constant import DOCUMENT_BATCH_SIZE
+from api.serializers import AuthorDocumentSerializer, RecipeDocumentSerializer
+from recipe.models import (
+    Cart,
+    Favorite,
+    IngredientsRecipe,
+    Recipe,
+    RecipeDocument,
+)
+from users.models import Follow
+
+logger = logging.getLogger('foodgram.documents')
+
+_pending: ContextVar[Optional[Set[int]]] = ContextVar(
+    'pending_documents',
+    default=None,
+)
+
+_deleting: ContextVar[Optional[Set[int]]] = ContextVar(
+    'deleting_recipes',
+    default=None,
+)
+
+
+def mark_deleting(recipe_id: int) -> None:
+    """Пропуск пересборки документа удаляемого рецепта.
+
+    Каскадное удаление связей рецепта вызывает сигналы до удаления самого
+    рецепта, и без этого документ был бы создан заново.
+    """
+    deleting = _deleting.get()
+    if deleting is None:
+        deleting = set()
+        _deleting.set(deleting)
+    deleting.add(recipe_id)
+
+
+def unmark_deleting(recipe_id: int) -> None:
+    _deleting.get().discard(recipe_id)
+
+
+def document_cache_key(recipe_id: int) -> str:
+    return f'recipe-document:{recipe_id}'
+
+
+def forget_cached_documents(recipe_ids: Iterable[int]) -> None:
+    """Удаление документов из кэша после коммита транзакции."""
+    keys = [document_cache_key(pk) for pk in recipe_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def postgres_documents_queryset(recipe_ids: List[int]) -> QuerySet:
+    """Рецепты с массивами тэгов и ингредиентов для PostgreSQL.
+
+    Массивы собираются в базе через `JSONB_AGG` в коррелированных
+    подзапросах, а автор читается через JOIN.
+    """
+    from django.contrib.postgres.aggregates import JSONBAgg
+
+    tags = (
+        Recipe.tags.through.objects.filter(recipe=OuterRef('pk'))
+        .order_by()
+        .values('recipe')
+        .annotate(
+            data=JSONBAgg(
+                JSONObject(
+                    name='tag__name',
+                    color='tag__color',
+                    slug='tag__slug',
+                    id='tag_id',
+                ),
+                ordering='tag__name',
+            ),
+        )
+        .values('data')
+    )
+    ingredients = (
+        IngredientsRecipe.objects.filter(recipe=OuterRef('pk'))
+        .order_by()
+        .values('recipe')
+        .annotate(
+            data=JSONBAgg(
+                JSONObject(
+                    name='ingredient__name',
+                    id='ingredient_id',
+                    measurement_unit='ingredient__measurement_unit',
+                    amount='amount',
+                ),
+                ordering='pk',
+            ),
+        )
+        .values('data')
+    )
+    return (
+        Recipe.objects.filter(pk__in=recipe_ids)
+        .select_related('author')
+        .annotate(
+            tags_data=Subquery(tags),
+            ingredients_data=Subquery(ingredients),
+        )
+    )
+
+
+def postgres_document(recipe: Recipe) -> dict:
+    """Документ рецепта из строки `postgres_documents_queryset`."""
+    return {
+        'name': recipe.name,
+        'id': recipe.pk,
+        'image': recipe.image.url if recipe.image else None,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'author': AuthorDocumentSerializer(recipe.author).data,
+        'tags': recipe.tags_data or [],
+        'ingredients': recipe.ingredients_data or [],
+    }
+
+
+def build_documents_postgres(recipe_ids: List[int]) -> Dict[int, dict]:
+    """Сборка документов одним запросом на PostgreSQL."""
+    return {
+        recipe.pk: postgres_document(recipe)
+        for recipe in postgres_documents_queryset(recipe_ids)
+    }
+
+
+def build_documents(recipe_ids: List[int]) -> Dict[int, dict]:
+    """Сборка документов рецептов.
+
+    На PostgreSQL документы собираются одним запросом, на остальных базах
+    данные читаются с `prefetch_related` и сериализуются.
+    """
+    if connection.vendor == 'postgresql':
+        return build_documents_postgres(recipe_ids)
+    recipes = (
+        Recipe.objects.filter(pk__in=recipe_ids)
+        .select_related('author')
+        .prefetch_related('tags', 'ingredientsrecipe__ingredient')
+    )
+    return {
+        recipe.pk: RecipeDocumentSerializer(recipe).data for recipe in recipes
+    }
+
+
+def rebuild_documents(recipe_ids: Iterable[int]) -> Dict[int, dict]:
+    """Пересборка документов рецептов пачками по `DOCUMENT_BATCH_SIZE`.
+
+    Существующие документы обновляются, недостающие создаются в той же
+    транзакции, поэтому читатели видят документ, согласованный с
+    закоммиченными данными рецепта.
+
+    Returns:
+        Словарь `id рецепта -> документ` для существующих рецептов.
+
+    """
+    recipe_ids = sorted(set(recipe_ids))
+    documents = {}
+    for start in range(0, len(recipe_ids), DOCUMENT_BATCH_SIZE):
+        batch = build_documents(recipe_ids[start:start + DOCUMENT_BATCH_SIZE])
+        now = timezone.now()
+        with transaction.atomic():
+            existing = set(
+                RecipeDocument.objects.select_for_update()
+                .filter(recipe__in=batch)
+                .values_list('recipe_id', flat=True),
+            )
+            RecipeDocument.objects.bulk_update(
+                [
+                    RecipeDocument(recipe_id=pk, data=data, updated=now)
+                    for pk, data in batch.items()
+                    if pk in existing
+                ],
+                ('data', 'updated'),
+            )
+            RecipeDocument.objects.bulk_create(
+                [
+                    RecipeDocument(recipe_id=pk, data=data, updated=now)
+                    for pk, data in batch.items()
+                    if pk not in existing
+                ],
+                ignore_conflicts=True,
+            )
+        forget_cached_documents(recipe_ids[start:start + DOCUMENT_BATCH_SIZE])
+        documents.update(batch)
+    return documents
+
+
+@contextmanager
+def deferred_rebuild() -> Iterator[None]:
+    """Сбор изменившихся рецептов и одна пересборка в конце блока.
+
+    Вызывается внутри транзакции записи, чтобы документ собирался один
+    раз после всех изменений рецепта, тэгов и ингредиентов.
+    """
+    if _pending.get() is not None:
+        yield
+        return
+    pending = set()
+    token = _pending.set(pending)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+    rebuild_documents(pending)
+
+
+def schedule_rebuild(recipe_ids: Iterable[int]) -> None:
+    """Пересборка документов сразу или в конце блока `deferred_rebuild`."""
+    recipe_ids = set(recipe_ids) - (_deleting.get() or set())
+    pending = _pending.get()
+    if pending is None:
+        rebuild_documents(recipe_ids)
+    else:
+        pending.update(recipe_ids)
+
+
+def get_documents(recipe_ids: List[int]) -> List[dict]:
+    """Документы рецептов в порядке `recipe_ids`.
+
+    Отсутствующие документы собираются в памяти и не сохраняются: чтение
+    может идти с реплики и не должно писать в базу. Документы создаются
+    сигналами при записи, миграцией `0009_backfill_documents` и командой
+    `rebuild_documents`.
+    """
+    documents = dict(
+        RecipeDocument.objects.filter(recipe__in=recipe_ids).values_list(
+            'recipe_id',
+            'data',
+        ),
+    )
+    missing = [pk for pk in recipe_ids if pk not in documents]
+    if missing:
+        logger.warning('Нет документов рецептов: %s', missing)
+        documents.update(build_documents(missing))
+    return [documents[pk] for pk in recipe_ids if pk in documents]
+
+
+def user_flag_annotations(user, recipe: str, author: str) -> dict:
+    """Подзапросы `EXISTS` признаков пользователя для аннотации.
+
+    Args:
+        user: Текущий пользователь.
+        recipe: Поле с id рецепта во внешнем запросе.
+        author: Поле с id автора во внешнем запросе.
+
+    """
+    return {
+        'favorited': Exists(
+            Favorite.objects.filter(user=user, recipe=OuterRef(recipe)),
+        ),
+        'in_cart': Exists(
+            Cart.objects.filter(user=user, recipe=OuterRef(recipe)),
+        ),
+        'subscribed': Exists(
+            Follow.objects.filter(user=user, author=OuterRef(author)),
+        ),
+    }
+
+
+def apply_user_flags(
+    document: dict,
+    flags: Tuple[bool, bool, bool],
+    request: Request,
+) -> dict:
+    """Запись признаков пользователя и абсолютной ссылки в документ."""
+    if document['image']:
+        document['image'] = request.build_absolute_uri(document['image'])
+    favorited, in_cart, subscribed = flags
+    document['author']['is_subscribed'] = subscribed
+    document['is_in_shopping_cart'] = in_cart
+    document['is_favorited'] = favorited
+    return document
+
+
+def overlay_user_flags(documents: List[dict], request: Request) -> List[dict]:
+    """Добавление в документы признаков текущего пользователя.
+
+    Признаки избранного, корзины и подписки на авторов страницы читаются
+    одним запросом с подзапросами `EXISTS`, относительные ссылки на
+    изображения заменяются абсолютными.
+
+    Args:
+        documents: Документы рецептов.
+        request: Объект запроса.
+
+    Returns:
+        Те же документы с признаками пользователя.
+
+    """
+    user = request.user
+    flags = {}
+    if user.is_authenticated:
+        flags = {
+            pk: (favorited, in_cart, subscribed)
+            for pk, favorited, in_cart, subscribed in Recipe.objects.filter(
+                pk__in=[document['id'] for document in documents],
+            )
+            .order_by()
+            .annotate(**user_flag_annotations(user, 'pk', 'author'))
+            .values_list('pk', 'favorited', 'in_cart', 'subscribed')
+        }
+    return [
+        apply_user_flags(
+            document,
+            flags.get(document['id'], (False, False, False)),
+            request,
+        )
+        for document in documents
+    ]
+
+
+def get_user_document(recipe_id: int, request: Request) -> Optional[dict]:
+    """Документ рецепта с признаками пользователя одним запросом.
+
+    Признаки читаются подзапросами `EXISTS` в запросе самого документа.
+    Если документа нет, он собирается в памяти, как в `get_documents`.
+
+    Returns:
+        Документ рецепта или None, если рецепта нет.
+
+    """
+    row = (
+        RecipeDocument.objects.filter(recipe=recipe_id)
+        .annotate(
+            **user_flag_annotations(
+                request.user,
+                'recipe_id',
+                'recipe__author_id',
+            ),
+        )
+        .values_list('data', 'favorited', 'in_cart', 'subscribed')
+        .first()
+    )
+    if row is None:
+        return next(
+            iter(overlay_user_flags(get_documents([recipe_id]), request)),
+            None,
+        )
+    return apply_user_flags(row[0], row[1:], request)
@@ -0,0 +1,183 @@
+import base64
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, List, Optional, Tuple
+
+from django.db.models import Count, F, Q, QuerySet
+from django.utils.dateparse import parse_datetime
+
+from api.constant import FEED_BACKFILL, FEED_BATCH_SIZE, FEED_FANOUT_LIMIT
+from recipe.models import FeedEntry, Recipe
+from users.models import AuthorStats, Follow, User
+
+Cursor = Tuple[datetime, int]
+
+
+def followers_count(author_id: int) -> int:
+    return (
+        AuthorStats.objects.filter(author=author_id)
+        .values_list('followers_count', flat=True)
+        .first()
+        or 0
+    )
+
+
+def change_followers_count(author_id: int, delta: int) -> None:
+    """Изменение счетчика подписчиков автора на `delta`.
+
+    Счетчик меняется через `F`, поэтому одновременные подписки не теряют
+    обновлений. Строка счетчика создается только при увеличении: при
+    каскадном удалении автора она уже удалена вместе с ним.
+    """
+    stats = AuthorStats.objects.filter(author=author_id)
+    if delta > 0:
+        AuthorStats.objects.bulk_create(
+            [AuthorStats(author_id=author_id)],
+            ignore_conflicts=True,
+        )
+    else:
+        stats = stats.filter(followers_count__gte=-delta)
+    stats.update(followers_count=F('followers_count') + delta)
+
+
+def recount_followers(author_ids: Iterable[int]) -> None:
+    """Пересчет счетчиков после массовых изменений подписок."""
+    author_ids = set(author_ids)
+    counts = dict(
+        Follow.objects.filter(author__in=author_ids)
+        .values('author')
+        .annotate(count=Count('pk'))
+        .values_list('author', 'count'),
+    )
+    AuthorStats.objects.filter(author__in=author_ids).delete()
+    AuthorStats.objects.bulk_create(
+        AuthorStats(author_id=pk, followers_count=counts.get(pk, 0))
+        for pk in author_ids
+    )
+
+
+def fan_out_recipe(recipe: Recipe) -> None:
+    """Добавление рецепта в ленты подписчиков автора пачками.
+
+    Для авторов, у которых подписчиков больше `FEED_FANOUT_LIMIT`, записи
+    не создаются: их рецепты подмешиваются в ленту при чтении.
+
+    Args:
+        recipe: Экземляр класса `Recipe`.
+
+    """
+    if followers_count(recipe.author_id) > FEED_FANOUT_LIMIT:
+        return
+    followers = (
+        Follow.objects.filter(author=recipe.author_id)
+        .values_list('user_id', flat=True)
+        .iterator(chunk_size=FEED_BATCH_SIZE)
+    )
+    while True:
+        batch = [
+            FeedEntry(user_id=user_id, recipe=recipe, pub_date=recipe.pub_date)
+            for user_id in islice(followers, FEED_BATCH_SIZE)
+        ]
+        if not batch:
+            return
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill_feed(user: User, author: User) -> None:
+    """Добавление последних рецептов автора в ленту нового подписчика."""
+    if followers_count(author.pk) > FEED_FANOUT_LIMIT:
+        return
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user=user, recipe_id=pk, pub_date=pub_date)
+            for pk, pub_date in author.recipes.order_by(
+                '-pub_date',
+            ).values_list('pk', 'pub_date')[:FEED_BACKFILL]
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def clear_feed(user: User, author: User) -> None:
+    """Удаление рецептов автора из ленты отписавшегося пользователя."""
+    FeedEntry.objects.filter(user=user, recipe__author=author).delete()
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    pub_date, pk = cursor
+    return base64.urlsafe_b64encode(
+        f'{pub_date.isoformat()}|{pk}'.encode(),
+    ).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Cursor]:
+    """Разбор курсора из параметра запроса.
+
+    Returns:
+        Дата публикации и id последнего рецепта страницы или None,
+        если курсор не передан или поврежден.
+
+    """
+    if not cursor:
+        return None
+    try:
+        pub_date, pk = base64.urlsafe_b64decode(cursor).decode().split('|')
+        pub_date, pk = parse_datetime(pub_date), int(pk)
+    except (ValueError, TypeError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+def before(queryset: QuerySet, cursor: Optional[Cursor], id_field: str):
+    if cursor is None:
+        return queryset
+    pub_date, pk = cursor
+    return queryset.filter(
+        Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, **{
+            f'{id_field}__lt': pk,
+        }),
+    )
+
+
+def read_feed(
+    user: User,
+    cursor: Optional[Cursor],
+    limit: int,
+) -> Tuple[List[int], Optional[Cursor]]:
+    """Страница ленты рецептов авторов, на которых подписан пользователь.
+
+    Записи ленты читаются одним проходом по индексу
+    `(user, -pub_date, -recipe)`. Рецепты авторов с большим числом
+    подписчиков, для которых записи не создавались, дочитываются из
+    `Recipe` и сливаются с записями ленты. Такие авторы определяются по
+    счетчику `AuthorStats`, который обновляется при подписке и отписке,
+    а не подсчетом подписчиков при чтении.
+
+    Args:
+        user: Экземляр класса `User`.
+        cursor: Позиция, после которой начинается страница.
+        limit: Размер страницы.
+
+    Returns:
+        Список id рецептов страницы и курсор следующей страницы.
+
+    """
+    rows = list(
+        before(FeedEntry.objects.filter(user=user), cursor, 'recipe_id')
+        .order_by('-pub_date', '-recipe_id')
+        .values_list('pub_date', 'recipe_id')[:limit],
+    )
+    heavy_authors = Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=FEED_FANOUT_LIMIT,
+    ).values('author')
+    rows += before(
+        Recipe.objects.filter(author__in=heavy_authors),
+        cursor,
+        'pk',
+    ).order_by('-pub_date', '-pk').values_list('pub_date', 'pk')[:limit]
+    rows = sorted(set(rows), reverse=True)[:limit]
+    next_cursor = rows[-1] if len(rows) == limit else None
+    return [pk for _, pk in rows], next_cursor
@@ -1,22 +1,80 @@
+from typing import List
+
+from django import forms
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
+from django_filters.widgets import QueryArrayWidget
+
+from recipe.models import Cart, Favorite, Ingredient, IngredientsRecipe, Recipe
+from users.models import User
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """Фильтр по списку целых чисел через запятую."""
+
+    field_class = forms.IntegerField
+
+
+class MultipleValueFilter(filters.Filter):
+    """Фильтр по всем значениям повторяющегося параметра запроса.
 
-from recipe.models import Ingredient, Recipe
+    Значения не сверяются со списком допустимых, поэтому, в отличие от
+    `AllValuesMultipleFilter`, построение формы фильтра не делает
+    запросов к БД.
+    """
+
+    field_class = forms.Field
+
+    def __init__(self, *args, **kwargs) -> None:
+        kwargs.setdefault('widget', QueryArrayWidget)
+        super().__init__(*args, **kwargs)
 
 
 class RecipeFilter(FilterSet):
     """Фильтр для модели `Recipe`."""
 
-    tags = filters.AllValuesMultipleFilter(
-        field_name='tags__slug',
-    )
+    tags = MultipleValueFilter(field_name='tags__slug', method='get_tags')
     is_in_shopping_cart = filters.NumberFilter(
         method='get_is_in_shopping_cart',
     )
     is_favorited = filters.NumberFilter(method='get_is_favorited')
+    ingredients = NumberInFilter(method='get_ingredients')
+    exclude_ingredients = NumberInFilter(method='get_exclude_ingredients')
+    ordering = filters.ChoiceFilter(
+        choices=(('trending', 'trending'),),
+        method='get_ordering',
+    )
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_in_shopping_cart', 'is_favorited')
+        fields = (
+            'tags',
+            'author',
+            'is_in_shopping_cart',
+            'is_favorited',
+            'ingredients',
+            'exclude_ingredients',
+            'ordering',
+        )
+
+    def get_tags(self, queryset: Recipe, _, slugs: List[str]) -> Recipe:
+        """Получение рецептов, у которых есть хотя бы один из тэгов.
+
+        Тэги проверяются через `EXISTS`, поэтому рецепт с несколькими
+        подходящими тэгами не дублируется и `DISTINCT` не нужен.
+
+        Returns:
+            Экземпляры модели `Recipe`.
+
+        """
+        return queryset.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe=OuterRef('pk'),
+                    tag__slug__in=slugs,
+                ),
+            ),
+        )
 
     def get_is_favorited(self, queryset: Recipe, _, value: int) -> Recipe:
         """Получение отфильтрованного по нахождению в избранном queryset.
@@ -26,7 +84,14 @@ class RecipeFilter(FilterSet):
 
         """
         if self.request.user.is_authenticated and value:
-            return queryset.filter(favorites__user=self.request.user)
+            return queryset.filter(
+                Exists(
+                    Favorite.objects.filter(
+                        recipe=OuterRef('pk'),
+                        user=self.request.user,
+                    ),
+                ),
+            )
         return queryset
 
     def get_is_in_shopping_cart(
@@ -42,9 +107,75 @@ class RecipeFilter(FilterSet):
 
         """
         if self.request.user.is_authenticated and number:
-            return queryset.filter(carts__user=self.request.user)
+            return queryset.filter(
+                Exists(
+                    Cart.objects.filter(
+                        recipe=OuterRef('pk'),
+                        user=self.request.user,
+                    ),
+                ),
+            )
         return queryset
 
+    def get_ingredients(
+        self,
+        queryset: Recipe,
+        _,
+        ingredients: List[int],
+    ) -> Recipe:
+        """Получение рецептов, содержащих все указанные ингредиенты.
+
+        Каждый ингредиент проверяется отдельным `EXISTS`, поэтому строки
+        рецептов не размножаются соединением с `IngredientsRecipe`.
+
+        Returns:
+            Экземпляры модели `Recipe`.
+
+        """
+        for ingredient in set(ingredients):
+            queryset = queryset.filter(
+                Exists(
+                    IngredientsRecipe.objects.filter(
+                        ingredient=ingredient,
+                        recipe=OuterRef('pk'),
+                    ),
+                ),
+            )
+        return queryset
+
+    def get_exclude_ingredients(
+        self,
+        queryset: Recipe,
+        _,
+        ingredients: List[int],
+    ) -> Recipe:
+        """Получение рецептов без указанных ингредиентов.
+
+        Returns:
+            Экземпляры модели `Recipe`.
+
+        """
+        return queryset.filter(
+            ~Exists(
+                IngredientsRecipe.objects.filter(
+                    ingredient__in=ingredients,
+                    recipe=OuterRef('pk'),
+                ),
+            ),
+        )
+
+    def get_ordering(self, queryset: Recipe, _, value: str) -> Recipe:
+        """Получение queryset, отсортированного по популярности.
+
+        Значение `trending_score` пересчитывается командой
+        `update_trending`, поэтому сортировка идет по индексу.
+
+        Returns:
+            Экземпляры модели `Recipe`.
+
+        """
+        return queryset.order_by('-trending_score', '-pub_date')
+
 
 class IngredientFilter(FilterSet):
     """Фильтр для модели `Ingredient`."""
@@ -54,3 +185,17 @@ class IngredientFilter(FilterSet):
     class Meta:
         model = Ingredient
         fields = ('name',)
+
+
+class UserFilter(FilterSet):
+    """Фильтр для модели `User` по началу имени пользователя.
+
+    Поиск чувствителен к регистру, чтобы использовать индекс
+    `user_username_prefix_idx`.
+    """
+
+    username = filters.CharFilter(lookup_expr='startswith')
+
+    class Meta:
+        model = User
+        fields = ('username',)
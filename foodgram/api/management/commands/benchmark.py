@@ -0,0 +1,584 @@
+import gzip
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.documents import rebuild_documents
+from api.feed import recount_followers
+from api.pantry import pantry_index
+from api.renderers import FastJSONRenderer, orjson
+from recipe.models import (
+    Cart,
+    Favorite,
+    Ingredient,
+    IngredientsRecipe,
+    Recipe,
+    Tag,
+)
+from users.models import Follow, User
+
+BENCH_PREFIX = 'bench_'
+BENCH_IMAGE = 'recipe/images/benchmark.png'
+RANDOM_SEED = 42
+MIN_REQUESTS = 2
+RENDER_PATH = '/api/recipes/?limit=50&page=1'
+STARTUP_SCRIPT = (
+    'import foodgram.wsgi; '
+    'from django.urls import get_resolver; '
+    'get_resolver().url_patterns'
+)
+STARTUP_TOP = 15
+
+Requester = Callable[[str], Tuple[int, Optional[int], int]]
+
+
+class Command(BaseCommand):
+    """Замер производительности основных эндпоинтов API.
+
+    Запросы выполняются через тестовый клиент Django (или к запущенному
+    серверу при указании `--base-url`), результаты сохраняются в JSON и
+    сравниваются с базовым замером.
+    """
+
+    help = 'Замер задержек и числа запросов к БД для основных эндпоинтов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            action='store_true',
+            help='Заполнить базу тестовыми пользователями и рецептами.',
+        )
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=100,
+            help=(
+                'Количество замеряемых запросов на эндпоинт, '
+                f'не меньше {MIN_REQUESTS} для расчета перцентилей.'
+            ),
+        )
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--base-url',
+            help='Адрес запущенного сервера, например http://127.0.0.1:8000.',
+        )
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--baseline', help='Файл с базовым замером.')
+        parser.add_argument(
+            '--startup',
+            action='store_true',
+            help='Замерить время импорта приложения через -X importtime.',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Допустимый рост p95 относительно базового замера.',
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < MIN_REQUESTS:
+            raise CommandError(
+                f'--requests должно быть не меньше {MIN_REQUESTS}',
+            )
+        if options['seed']:
+            self.seed(options['users'], options['recipes'])
+        user = User.objects.filter(
+            username=f'{BENCH_PREFIX}user_0',
+        ).first()
+        if user is None:
+            raise CommandError(
+                'Нет тестовых данных, запустите команду с флагом --seed',
+            )
+        token, _ = Token.objects.get_or_create(user=user)
+        results = {
+            'meta': {
+                'requests': options['requests'],
+                'warmup': options['warmup'],
+                'base_url': options['base_url'],
+                'vendor': connection.vendor,
+                'recipes': Recipe.objects.count(),
+            },
+            'endpoints': {},
+        }
+        if options['startup']:
+            results['startup'] = self.measure_startup()
+        request = self.get_requester(options['base_url'], token.key)
+        with override_settings(
+            ALLOWED_HOSTS=['*'],
+            REST_FRAMEWORK={
+                **settings.REST_FRAMEWORK,
+                'DEFAULT_THROTTLE_RATES': {},
+            },
+            CONCURRENCY_LIMITS={},
+        ):
+            for name, path in self.get_endpoints():
+                results['endpoints'][name] = self.measure(
+                    request,
+                    path,
+                    options['requests'],
+                    options['warmup'],
+                )
+                self.report(name, results['endpoints'][name])
+            if not options['base_url']:
+                results['rendering'] = self.measure_rendering(
+                    token.key,
+                    options['requests'],
+                )
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        self.stdout.write(
+            self.style.SUCCESS(f'Результаты сохранены в {options["output"]}'),
+        )
+        problems = [
+            f'{name}: ответы с ошибками {errors}'
+            for name, errors in self.get_errors(results['endpoints']).items()
+        ]
+        if options['baseline']:
+            problems += self.compare(
+                results,
+                options['baseline'],
+                options['threshold'],
+            )
+        if problems:
+            raise CommandError(
+                'Обнаружены проблемы:\n' + '\n'.join(problems),
+            )
+        self.stdout.write(self.style.SUCCESS('Проблем не обнаружено'))
+
+    @staticmethod
+    def get_endpoints() -> List[Tuple[str, Callable[[int], str]]]:
+        """Список замеряемых эндпоинтов.
+
+        Returns:
+            Пары из названия эндпоинта и функции, строящей путь по номеру
+            запроса.
+
+        """
+        tags = '&'.join(
+            f'tags={slug}'
+            for slug in Tag.objects.values_list('slug', flat=True)[:2]
+        )
+        recipe_ids = list(
+            Recipe.objects.filter(
+                author__username__startswith=BENCH_PREFIX,
+            ).values_list('id', flat=True)[:100],
+        )
+        popular = list(
+            IngredientsRecipe.objects.values('ingredient')
+            .annotate(recipes=Count('recipe'))
+            .order_by('-recipes')
+            .values_list('ingredient', flat=True)[:3],
+        )
+        ingredients = (
+            f'ingredients={popular[0]}'
+            f'&exclude_ingredients={",".join(map(str, popular[1:]))}'
+        )
+        prefixes = [
+            name[:2]
+            for name in Ingredient.objects.values_list('name', flat=True)[
+                :: max(Ingredient.objects.count() // 20, 1)
+            ]
+        ]
+        return [
+            ('recipes_list', lambda i: '/api/recipes/?limit=6&page=1'),
+            (
+                'recipes_list_tags',
+                lambda i: f'/api/recipes/?limit=6&page=1&{tags}',
+            ),
+            (
+                'recipes_list_ingredients',
+                lambda i: f'/api/recipes/?limit=6&page=1&{ingredients}',
+            ),
+            (
+                'recipes_retrieve',
+                lambda i: f'/api/recipes/{recipe_ids[i % len(recipe_ids)]}/',
+            ),
+            (
+                'download_shopping_cart',
+                lambda i: '/api/recipes/download_shopping_cart/',
+            ),
+            (
+                'subscriptions',
+                lambda i: '/api/users/subscriptions/?limit=6&recipes_limit=3',
+            ),
+            ('users', lambda i: '/api/users/?limit=10'),
+            (
+                'ingredients_autocomplete',
+                lambda i: '/api/ingredients/?name='
+                + prefixes[i % len(prefixes)],
+            ),
+        ]
+
+    @staticmethod
+    def get_requester(base_url: Optional[str], token: str) -> Requester:
+        """Функция для выполнения одного запроса.
+
+        Args:
+            base_url: Адрес сервера или None для тестового клиента.
+            token: Токен тестового пользователя.
+
+        Returns:
+            Функция, возвращающая статус ответа, число запросов к БД
+            (None, если запросы к БД посчитать нельзя) и размер тела
+            ответа в байтах с учетом сжатия.
+
+        """
+        if base_url:
+
+            def request(path: str) -> Tuple[int, Optional[int], int]:
+                req = urllib.request.Request(
+                    base_url.rstrip('/')
+                    + urllib.parse.quote(path, safe='/?=&'),
+                    headers={
+                        'Authorization': f'Token {token}',
+                        'Accept-Encoding': 'gzip',
+                    },
+                )
+                try:
+                    with urllib.request.urlopen(req) as response:
+                        return response.status, None, len(response.read())
+                except urllib.error.HTTPError as error:
+                    return error.code, None, len(error.read())
+
+            return request
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+        def request(path: str) -> Tuple[int, Optional[int], int]:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(path, HTTP_ACCEPT_ENCODING='gzip')
+                if response.streaming:
+                    body = b''.join(response.streaming_content)
+                else:
+                    body = response.content
+            return response.status_code, len(queries), len(body)
+
+        return request
+
+    @staticmethod
+    def measure(
+        request: Requester,
+        path: Callable[[int], str],
+        requests: int,
+        warmup: int,
+    ) -> Dict[str, Any]:
+        """Замер одного эндпоинта.
+
+        Returns:
+            Перцентили задержки в миллисекундах, пропускная способность,
+            число запросов к БД, средний размер ответа и статусы ответов.
+
+        """
+        for i in range(warmup):
+            request(path(i))
+        timings = []
+        queries = []
+        sizes = []
+        statuses = {}
+        started = time.perf_counter()
+        for i in range(requests):
+            start = time.perf_counter()
+            status, count, size = request(path(i))
+            timings.append((time.perf_counter() - start) * 1000)
+            sizes.append(size)
+            if count is not None:
+                queries.append(count)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        elapsed = time.perf_counter() - started
+        percentiles = statistics.quantiles(
+            timings,
+            n=100,
+            method='inclusive',
+        )
+        return {
+            'p50_ms': round(percentiles[49], 3),
+            'p95_ms': round(percentiles[94], 3),
+            'p99_ms': round(percentiles[98], 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'rps': round(requests / elapsed, 2),
+            'queries': max(queries) if queries else None,
+            'bytes': round(statistics.mean(sizes)),
+            'statuses': statuses,
+        }
+
+    @staticmethod
+    def get_errors(
+        endpoints: Dict[str, Dict[str, Any]],
+    ) -> Dict[str, Dict[str, int]]:
+        """Ответы со статусами не из диапазона 2xx по эндпоинтам.
+
+        Быстрые ответы с ошибками искажают задержки, поэтому такой замер
+        нельзя использовать ни как результат, ни как базовый.
+        """
+        errors = {}
+        for name, result in endpoints.items():
+            failed = {
+                status: count
+                for status, count in result.get('statuses', {}).items()
+                if not status.startswith('2')
+            }
+            if failed:
+                errors[name] = failed
+        return errors
+
+    def report(self, name: str, result: Dict[str, Any]) -> None:
+        line = (
+            f'{name:<26} p50={result["p50_ms"]:>8.2f}ms '
+            f'p95={result["p95_ms"]:>8.2f}ms '
+            f'p99={result["p99_ms"]:>8.2f}ms '
+            f'rps={result["rps"]:>8.2f} '
+            f'queries={result["queries"]} '
+            f'bytes={result["bytes"]} '
+            f'statuses={result["statuses"]}'
+        )
+        if self.get_errors({name: result}):
+            line = self.style.ERROR(line)
+        self.stdout.write(line)
+
+    def measure_rendering(self, token: str, requests: int) -> Dict[str, Any]:
+        """Сравнение рендереров JSON на странице списка рецептов.
+
+        Returns:
+            Для каждого рендерера среднее время рендеринга в миллисекундах,
+            размер ответа и размер после сжатия gzip.
+
+        """
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        data = client.get(RENDER_PATH).data
+        renderers = {'json': JSONRenderer()}
+        if orjson is not None:
+            renderers['orjson'] = FastJSONRenderer()
+        results = {}
+        for name, renderer in renderers.items():
+            start = time.perf_counter()
+            for _ in range(requests):
+                body = renderer.render(data)
+            results[name] = {
+                'render_ms': round(
+                    (time.perf_counter() - start) * 1000 / requests,
+                    3,
+                ),
+                'bytes': len(body),
+                'gzip_bytes': len(gzip.compress(body)),
+            }
+            self.stdout.write(
+                f'render {name:<19} '
+                f'mean={results[name]["render_ms"]:>8.3f}ms '
+                f'bytes={results[name]["bytes"]} '
+                f'gzip={results[name]["gzip_bytes"]}',
+            )
+        return results
+
+    def measure_startup(self) -> Dict[str, Any]:
+        """Замер импорта приложения в отдельном процессе.
+
+        Процесс импортирует WSGI-приложение и URLconf так же, как воркер
+        gunicorn до первого запроса.
+
+        Returns:
+            Общее время процесса, суммарное время импорта и самые тяжелые
+            пакеты по собственному времени импорта в миллисекундах.
+
+        """
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            capture_output=True,
+            text=True,
+        )
+        total = (time.perf_counter() - start) * 1000
+        if process.returncode:
+            raise CommandError(process.stderr)
+        packages = {}
+        for line in process.stderr.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            own, _, name = line[len('import time:'):].split('|')
+            if not own.strip().isdigit():
+                continue
+            package = name.strip().split('.')[0]
+            packages[package] = packages.get(package, 0) + int(own) / 1000
+        top = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+        result = {
+            'process_ms': round(total, 2),
+            'imports_ms': round(sum(packages.values()), 2),
+            'top': [[name, round(ms, 2)] for name, ms in top[:STARTUP_TOP]],
+        }
+        self.stdout.write(
+            f'startup process={result["process_ms"]:.2f}ms '
+            f'imports={result["imports_ms"]:.2f}ms',
+        )
+        for name, ms in result['top']:
+            self.stdout.write(f'  {name:<40} {ms:>8.2f}ms')
+        return result
+
+    def compare(
+        self,
+        results: Dict[str, Any],
+        baseline_file: str,
+        threshold: float,
+    ) -> List[str]:
+        """Сравнение результатов с базовым замером.
+
+        Эндпоинты, на которых базовый замер получал ответы с ошибками, не
+        сравниваются и попадают в список проблем.
+
+        Returns:
+            Описания регрессий p95 и числа запросов к БД.
+
+        """
+        with open(baseline_file, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['endpoints']
+        regressions = [
+            f'{name}: базовый замер содержит ответы с ошибками {errors}'
+            for name, errors in self.get_errors(baseline).items()
+            if name in results['endpoints']
+        ]
+        for name, result in results['endpoints'].items():
+            base = baseline.get(name)
+            if base is None or name in self.get_errors(baseline):
+                continue
+            if result['p95_ms'] > base['p95_ms'] * (1 + threshold):
+                regressions.append(
+                    f'{name}: p95 {base["p95_ms"]}ms -> {result["p95_ms"]}ms',
+                )
+            if (
+                result['queries'] is not None
+                and base['queries'] is not None
+                and result['queries'] > base['queries']
+            ):
+                regressions.append(
+                    f'{name}: запросов к БД '
+                    f'{base["queries"]} -> {result["queries"]}',
+                )
+        return regressions
+
+    @transaction.atomic
+    def seed(self, users: int, recipes: int) -> None:
+        """Заполнение базы воспроизводимым набором тестовых данных.
+
+        Args:
+            users: Количество пользователей.
+            recipes: Количество рецептов.
+
+        Raises:
+            CommandError: В базе нет ингредиентов или тэгов.
+
+        """
+        rnd = random.Random(RANDOM_SEED)
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        if not ingredient_ids or not tag_ids:
+            raise CommandError(
+                'Сначала загрузите ингредиенты и тэги: manage.py comand',
+            )
+        password = make_password(None)
+        User.objects.bulk_create(
+            [
+                User(
+                    username=f'{BENCH_PREFIX}user_{i}',
+                    email=f'{BENCH_PREFIX}user_{i}@example.com',
+                    first_name='Bench',
+                    last_name=str(i),
+                    password=password,
+                )
+                for i in range(users)
+            ],
+            ignore_conflicts=True,
+        )
+        authors = list(
+            User.objects.filter(
+                username__startswith=BENCH_PREFIX,
+            ).values_list('id', flat=True),
+        )
+        Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    author_id=rnd.choice(authors),
+                    name=f'{BENCH_PREFIX}recipe_{i}',
+                    text='Описание тестового рецепта. ' * rnd.randint(1, 40),
+                    cooking_time=rnd.randint(1, 120),
+                    image=BENCH_IMAGE,
+                )
+                for i in range(recipes)
+            ],
+            batch_size=500,
+        )
+        recipe_ids = list(
+            Recipe.objects.filter(
+                name__startswith=BENCH_PREFIX,
+                ingredientsrecipe__isnull=True,
+            ).values_list('id', flat=True),
+        )
+        IngredientsRecipe.objects.bulk_create(
+            [
+                IngredientsRecipe(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=rnd.randint(1, 400),
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in rnd.sample(
+                    ingredient_ids,
+                    rnd.randint(3, 10),
+                )
+            ],
+            batch_size=1000,
+        )
+        Recipe.tags.through.objects.bulk_create(
+            [
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in rnd.sample(tag_ids, rnd.randint(1, len(tag_ids)))
+            ],
+            batch_size=1000,
+        )
+        user = User.objects.get(username=f'{BENCH_PREFIX}user_0')
+        sample = rnd.sample(recipe_ids, min(len(recipe_ids), 20))
+        Favorite.objects.bulk_create(
+            [Favorite(user=user, recipe_id=pk) for pk in sample],
+            ignore_conflicts=True,
+        )
+        Cart.objects.bulk_create(
+            [Cart(user=user, recipe_id=pk) for pk in sample],
+            ignore_conflicts=True,
+        )
+        Follow.objects.bulk_create(
+            [
+                Follow(user=user, author_id=pk)
+                for pk in rnd.sample(authors, min(len(authors), 30))
+                if pk != user.pk
+            ],
+            ignore_conflicts=True,
+        )
+        recount_followers(authors)
+        rebuild_documents(recipe_ids)
+        transaction.on_commit(pantry_index.invalidate)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Создано рецептов: {len(recipe_ids)}, '
+                f'авторов: {len(authors)}',
+            ),
+        )
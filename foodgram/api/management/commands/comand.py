@@ -1,49 +1,249 @@
 import csv
+import json
 import os
+import re
+from itertools import islice
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
 
+from api.cache import bump_version
 from recipe.models import Ingredient, Tag
 
-MODEL_CSV = {
-    'ingredients.csv': Ingredient,
-    'tags.csv': Tag,
+DEFAULT_FILES = ('ingredients.csv', 'tags.csv')
+MODELS = {
+    'ingredients': Ingredient,
+    'tags': Tag,
 }
+MODEL_FIELDS = {
+    Ingredient: ('name', 'measurement_unit'),
+    Tag: ('name', 'color', 'slug'),
+}
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = re.compile(r'\s*')
+
+
+class JSONArrayReader:
+    """Потоковый разбор json-файла со списком верхнего уровня.
+
+    Файл читается кусками по `chunk_size` символов, а элементы списка
+    декодируются по одному через `JSONDecoder.raw_decode`, поэтому в
+    памяти держится только текущий кусок файла.
+    """
+
+    def __init__(self, file: IO[str], chunk_size: int = CHUNK_SIZE) -> None:
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def read(self) -> None:
+        chunk = self.file.read(self.chunk_size)
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        self.eof = not chunk
+
+    def next_char(self) -> str:
+        """Следующий непробельный символ без его извлечения."""
+        while True:
+            self.position = WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer) or self.eof:
+                return self.buffer[self.position:self.position + 1]
+            self.read()
+
+    def expect(self, chars: str) -> str:
+        char = self.next_char()
+        if not char or char not in chars:
+            raise CommandError(
+                f'Неверный формат json: ожидался один из символов {chars}',
+            )
+        self.position += 1
+        return char
+
+    def decode(self) -> Any:
+        """Декодирование элемента, при необходимости с дочитыванием.
+
+        Элемент, упирающийся в конец буфера, мог быть прочитан не целиком,
+        поэтому он декодируется заново после чтения следующего куска.
+        """
+        while True:
+            try:
+                item, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                end = None
+            if end is not None and (end < len(self.buffer) or self.eof):
+                self.position = end
+                return item
+            if self.eof:
+                raise CommandError('Неверный формат json')
+            self.read()
+
+    def __iter__(self) -> Iterator[Any]:
+        self.expect('[')
+        if self.next_char() == ']':
+            return
+        while True:
+            self.next_char()
+            yield self.decode()
+            if self.expect(',]') == ']':
+                return
+
+
+def read_ndjson(file: IO[str], path: str) -> Iterator[Any]:
+    """Чтение ndjson/jsonl с объектом на каждой непустой строке.
+
+    Raises:
+        CommandError: Строка не является json, в ошибке указан ее номер.
+
+    """
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as error:
+            raise CommandError(
+                f'{path}, строка {number}: неверный json ({error.msg})',
+            )
 
 
 class Command(BaseCommand):
-    """Загрузчик данных с csv-файла."""
+    """Загрузчик данных с csv/json-файлов.
+
+    Строки читаются потоком и записываются пачками через
+    `bulk_create(ignore_conflicts=True)`, поэтому повторный запуск не
+    создает дубликатов. Все файлы загружаются в одной транзакции.
+    """
+
+    help = 'Загрузка каталогов ингредиентов и тэгов из csv/json/ndjson'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            help='Пути к файлам. По умолчанию загружаются файлы из data/.',
+        )
+        parser.add_argument(
+            '--model',
+            choices=MODELS,
+            help='Модель для загрузки, если ее нельзя понять по имени файла.',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
 
     def handle(self, *args, **options):
+        paths = options['paths'] or [
+            os.path.join(settings.BASE_DIR, 'data', file)
+            for file in DEFAULT_FILES
+        ]
         self.stdout.write(
             self.style.HTTP_INFO('Загрузка в базы данных началась'),
         )
-        for file, model in MODEL_CSV.items():
-            csv_file = os.path.join(
-                os.path.join(settings.BASE_DIR, 'data'),
-                file,
+        with transaction.atomic():
+            for path in paths:
+                model = self.get_model(path, options['model'])
+                self.load(path, model, options['batch_size'])
+        bump_version(*MODELS)
+        self.stdout.write(
+            self.style.SUCCESS('Данные из файлов загружены успешно!'),
+        )
+
+    @staticmethod
+    def get_model(path: str, name: Optional[str] = None) -> models.Model:
+        """Определение модели по имени файла или аргументу `--model`.
+
+        Raises:
+            CommandError: Модель определить не удалось.
+
+        """
+        if name:
+            return MODELS[name]
+        file = os.path.basename(path).lower()
+        for prefix, model in MODELS.items():
+            if file.startswith(prefix.rstrip('s')):
+                return model
+        raise CommandError(f'Не удалось определить модель для {path}')
+
+    @staticmethod
+    def read_rows(path: str, fields: Iterable[str]) -> Iterator[Dict]:
+        """Потоковое чтение строк из файла.
+
+        Поддерживаются csv без заголовка (порядок колонок как в `fields`),
+        json со списком объектов и ndjson/jsonl с объектом на строке.
+
+        Raises:
+            CommandError: Файл не найден или формат не поддерживается.
+
+        """
+        extension = os.path.splitext(path)[1].lower()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if extension == '.csv':
+                    for row in csv.reader(f):
+                        if row:
+                            yield dict(zip(fields, row))
+                elif extension in ('.ndjson', '.jsonl'):
+                    yield from read_ndjson(f, path)
+                elif extension == '.json':
+                    yield from JSONArrayReader(f)
+                else:
+                    raise CommandError(f'Неизвестный формат файла {path}')
+        except FileNotFoundError:
+            raise CommandError(f'Не найден файл с данными {path}!')
+
+    @staticmethod
+    def clean_row(
+        row: Any,
+        fields: Iterable[str],
+        path: str,
+        number: int,
+    ) -> Dict[str, str]:
+        """Проверка строки файла и удаление пробелов по краям значений.
+
+        Raises:
+            CommandError: Строка не объект или в ней нет строкового
+            значения одного из полей `fields`.
+
+        """
+        if not isinstance(row, dict):
+            raise CommandError(
+                f'{path}, запись {number}: ожидался объект, '
+                f'получено {type(row).__name__}',
             )
-            try:
-                with open(csv_file, 'r', encoding='utf-8') as f:
-                    reader = csv.reader(f)
-                    if model == Ingredient:
-                        for row in reader:
-                            name, measurement_unit = row
-                            model.objects.get_or_create(
-                                name=name,
-                                measurement_unit=measurement_unit,
-                            )
-                    else:
-                        for row in reader:
-                            name, color, slug = row
-                            model.objects.get_or_create(
-                                name=name,
-                                color=color,
-                                slug=slug,
-                            )
-            except FileNotFoundError:
-                raise CommandError('Не найден файл с данными!')
+        invalid = [
+            field for field in fields if not isinstance(row.get(field), str)
+        ]
+        if invalid:
+            raise CommandError(
+                f'{path}, запись {number}: нет строковых полей '
+                f'{", ".join(invalid)}',
+            )
+        return {field: row[field].strip() for field in fields}
+
+    def load(self, path: str, model: models.Model, batch_size: int) -> None:
+        """Загрузка одного файла пачками по `batch_size` строк."""
+        fields = MODEL_FIELDS[model]
+        before = model.objects.count()
+        processed = 0
+        rows = enumerate(self.read_rows(path, fields), 1)
+        while True:
+            batch: List[models.Model] = [
+                model(**self.clean_row(row, fields, path, number))
+                for number, row in islice(rows, batch_size)
+            ]
+            if not batch:
+                break
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            processed += len(batch)
+            self.stdout.write(f'{os.path.basename(path)}: {processed} строк')
+        created = model.objects.count() - before
         self.stdout.write(
-            self.style.SUCCESS('Данные из .csv ' 'файлов загружены успешно!'),
+            self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: обработано {processed}, '
+                f'добавлено {created}, пропущено {processed - created}',
+            ),
         )
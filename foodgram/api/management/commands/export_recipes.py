@@ -0,0 +1,103 @@
+import json
+import sys
+from typing import Any, Dict
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from recipe.models import IngredientsRecipe, Recipe
+
+CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    """Потоковая выгрузка рецептов в формате NDJSON.
+
+    Рецепты читаются пачками по первичному ключу, для каждой пачки теги и
+    ингредиенты подгружаются через `prefetch_related`, поэтому расход
+    памяти не зависит от количества рецептов.
+    """
+
+    help = 'Выгрузка рецептов с тэгами и ингредиентами в NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default='-',
+            help='Файл для выгрузки, по умолчанию stdout.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            self.export(sys.stdout, options['chunk_size'])
+            return
+        with open(options['path'], 'w', encoding='utf-8') as f:
+            exported = self.export(f, options['chunk_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Выгружено рецептов: {exported}'),
+        )
+
+    @staticmethod
+    def serialize(recipe: Recipe) -> Dict[str, Any]:
+        """Представление рецепта с естественными ключами связей.
+
+        Args:
+            recipe: Экземляр класса `Recipe`.
+
+        Returns:
+            Словарь для записи одной строкой NDJSON.
+
+        """
+        return {
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'image': recipe.image.name,
+            'author': recipe.author.email,
+            'pub_date': recipe.pub_date.isoformat(),
+            'tags': [tag.slug for tag in recipe.tags.all()],
+            'ingredients': [
+                {
+                    'name': link.ingredient.name,
+                    'measurement_unit': link.ingredient.measurement_unit,
+                    'amount': link.amount,
+                }
+                for link in recipe.ingredientsrecipe.all()
+            ],
+        }
+
+    def export(self, stream, chunk_size: int) -> int:
+        """Запись рецептов в поток пачками по `chunk_size`.
+
+        Returns:
+            Количество выгруженных рецептов.
+
+        """
+        queryset = (
+            Recipe.objects.select_related('author')
+            .prefetch_related(
+                'tags',
+                Prefetch(
+                    'ingredientsrecipe',
+                    queryset=IngredientsRecipe.objects.select_related(
+                        'ingredient',
+                    ),
+                ),
+            )
+            .order_by('pk')
+        )
+        exported = 0
+        last_pk = 0
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                return exported
+            for recipe in chunk:
+                stream.write(
+                    json.dumps(self.serialize(recipe), ensure_ascii=False),
+                )
+                stream.write('\n')
+            exported += len(chunk)
+            last_pk = chunk[-1].pk
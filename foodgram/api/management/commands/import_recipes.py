@@ -0,0 +1,164 @@
+import json
+import sys
+from itertools import islice
+from typing import Any, Dict, List, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from api.cache import bump_version
+from api.documents import rebuild_documents
+from api.pantry import pantry_index
+from recipe.models import Ingredient, IngredientsRecipe, Recipe, Tag
+from users.models import User
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    """Потоковая загрузка рецептов из NDJSON, выгруженного `export_recipes`.
+
+    Авторы, тэги и ингредиенты ищутся по естественным ключам (почта, слаг,
+    название с единицей измерения). Каждая пачка записывается отдельной
+    транзакцией через `bulk_create`.
+    """
+
+    help = 'Загрузка рецептов из NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default='-',
+            help='Файл для загрузки, по умолчанию stdin.',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        self.tags = dict(Tag.objects.values_list('slug', 'id'))
+        self.imported = 0
+        self.skipped = 0
+        if options['path'] == '-':
+            self.load(sys.stdin, options['batch_size'])
+        else:
+            try:
+                with open(options['path'], 'r', encoding='utf-8') as f:
+                    self.load(f, options['batch_size'])
+            except FileNotFoundError:
+                raise CommandError(f'Не найден файл {options["path"]}!')
+        bump_version('recipes')
+        pantry_index.invalidate()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Загружено рецептов: {self.imported}, '
+                f'пропущено: {self.skipped}',
+            ),
+        )
+
+    def load(self, stream, batch_size: int) -> None:
+        records = (json.loads(line) for line in stream if line.strip())
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                return
+            self.import_batch(batch)
+            self.stdout.write(f'Обработано: {self.imported + self.skipped}')
+
+    def resolve(
+        self,
+        batch: List[Dict[str, Any]],
+    ) -> Tuple[Dict[str, int], Dict[Tuple[str, str], int]]:
+        """Поиск авторов и ингредиентов пачки по естественным ключам.
+
+        Returns:
+            Словари `почта -> id` и `(название, единица) -> id`.
+
+        """
+        authors = dict(
+            User.objects.filter(
+                email__in={record['author'] for record in batch},
+            ).values_list('email', 'id'),
+        )
+        names = {
+            item['name'] for record in batch for item in record['ingredients']
+        }
+        ingredients = {
+            (name, unit): pk
+            for pk, name, unit in Ingredient.objects.filter(
+                name__in=names,
+            ).values_list('id', 'name', 'measurement_unit')
+        }
+        return authors, ingredients
+
+    @transaction.atomic
+    def import_batch(self, batch: List[Dict[str, Any]]) -> None:
+        authors, ingredients = self.resolve(batch)
+        recipes = []
+        links = []
+        for record in batch:
+            keys = [
+                (item['name'], item['measurement_unit'])
+                for item in record['ingredients']
+            ]
+            missing = (
+                [record['author']] if record['author'] not in authors else []
+            )
+            missing += [
+                slug for slug in record['tags'] if slug not in self.tags
+            ]
+            missing += [key[0] for key in keys if key not in ingredients]
+            if missing:
+                self.skipped += 1
+                self.stderr.write(
+                    f'Рецепт "{record["name"]}" пропущен, не найдены: '
+                    + ', '.join(missing),
+                )
+                continue
+            recipes.append(
+                Recipe(
+                    name=record['name'],
+                    text=record['text'],
+                    cooking_time=record['cooking_time'],
+                    image=record['image'],
+                    author_id=authors[record['author']],
+                ),
+            )
+            links.append((record, keys))
+        self.create_recipes(recipes)
+        IngredientsRecipe.objects.bulk_create(
+            [
+                IngredientsRecipe(
+                    recipe=recipe,
+                    ingredient_id=ingredients[key],
+                    amount=item['amount'],
+                )
+                for recipe, (record, keys) in zip(recipes, links)
+                for key, item in zip(keys, record['ingredients'])
+            ],
+        )
+        Recipe.tags.through.objects.bulk_create(
+            [
+                Recipe.tags.through(recipe=recipe, tag_id=self.tags[slug])
+                for recipe, (record, _) in zip(recipes, links)
+                for slug in record['tags']
+            ],
+        )
+        for recipe, (record, _) in zip(recipes, links):
+            recipe.pub_date = parse_datetime(record['pub_date'])
+        Recipe.objects.bulk_update(recipes, ('pub_date',))
+        rebuild_documents(recipe.pk for recipe in recipes)
+        self.imported += len(recipes)
+
+    @staticmethod
+    def create_recipes(recipes: List[Recipe]) -> None:
+        """Создание рецептов с получением их первичных ключей.
+
+        SQLite в Django 3.2 не возвращает ключи из `bulk_create`, поэтому
+        для него рецепты сохраняются по одному внутри общей транзакции.
+        """
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+            return
+        for recipe in recipes:
+            recipe.save()
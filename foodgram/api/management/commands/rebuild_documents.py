@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.constant import DOCUMENT_BATCH_SIZE
+from api.documents import rebuild_documents
+from recipe.models import Recipe
+
+
+class Command(BaseCommand):
+    """Пересборка документов `RecipeDocument` для всех рецептов."""
+
+    help = 'Пересборка документов рецептов'
+
+    def handle(self, *args, **options):
+        ids = list(Recipe.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(ids), DOCUMENT_BATCH_SIZE):
+            rebuild_documents(ids[start:start + DOCUMENT_BATCH_SIZE])
+            self.stdout.write(
+                f'Обработано: {min(start + DOCUMENT_BATCH_SIZE, len(ids))}',
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано документов: {len(ids)}'),
+        )
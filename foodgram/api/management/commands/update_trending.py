@@ -0,0 +1,75 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.constant import (
+    TRENDING_CART_WEIGHT,
+    TRENDING_FAVORITE_WEIGHT,
+    TRENDING_HALF_LIFE_HOURS,
+    TRENDING_HORIZON_DAYS,
+)
+from recipe.models import Cart, Favorite, Recipe
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """Пересчет популярности рецептов с экспоненциальным затуханием.
+
+    Каждое добавление в избранное или корзину дает вклад
+    `вес * 0.5 ** (возраст / период полураспада)`. Учитываются только
+    события за последние `--horizon-days` дней, после которых вклад
+    пренебрежимо мал, поэтому обновляются только рецепты с недавней
+    активностью. Команду нужно запускать периодически, например из cron.
+    """
+
+    help = 'Пересчет поля trending_score для сортировки ?ordering=trending'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--half-life-hours',
+            type=float,
+            default=TRENDING_HALF_LIFE_HOURS,
+        )
+        parser.add_argument(
+            '--horizon-days',
+            type=float,
+            default=TRENDING_HORIZON_DAYS,
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        since = now - timedelta(days=options['horizon_days'])
+        half_life = options['half_life_hours'] * 3600
+        scores = defaultdict(float)
+        for model, weight in (
+            (Favorite, TRENDING_FAVORITE_WEIGHT),
+            (Cart, TRENDING_CART_WEIGHT),
+        ):
+            for recipe_id, created in (
+                model.objects.filter(created__gte=since)
+                .values_list('recipe_id', 'created')
+                .iterator()
+            ):
+                age = (now - created).total_seconds()
+                scores[recipe_id] += weight * 0.5 ** (age / half_life)
+        with transaction.atomic():
+            Recipe.objects.filter(trending_score__gt=0).update(
+                trending_score=0,
+            )
+            Recipe.objects.bulk_update(
+                [
+                    Recipe(pk=pk, trending_score=score)
+                    for pk, score in scores.items()
+                ],
+                ('trending_score',),
+                batch_size=BATCH_SIZE,
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Обновлена популярность {len(scores)} рецептов',
+            ),
+        )
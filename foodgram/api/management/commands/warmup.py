@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.warmup import warmup
+
+
+class Command(BaseCommand):
+    """Прогрев модулей и кэшей, которые иначе загружаются первым запросом."""
+
+    help = 'Прогрев воркера'
+
+    def handle(self, *args, **options):
+        failed = []
+        for name, duration in warmup().items():
+            if duration is None:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(f'{name:<16} ошибка'))
+            else:
+                self.stdout.write(f'{name:<16} {duration:>8.2f}ms')
+        if failed:
+            raise CommandError(f'Прогрев не выполнен: {", ".join(failed)}')
+        self.stdout.write(self.style.SUCCESS('Прогрев завершен'))
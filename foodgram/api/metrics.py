@@ -0,0 +1,292 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+METRICS = {
+    'http_request_duration_seconds': (
+        'histogram',
+        'Время обработки запроса по маршрутам.',
+    ),
+    'http_responses_total': ('counter', 'Количество ответов по статусам.'),
+    'db_queries_total': ('counter', 'Количество запросов к БД по маршрутам.'),
+    'cache_requests_total': (
+        'counter',
+        'Обращения к кэшу с результатом hit/miss.',
+    ),
+    'rejected_requests_total': (
+        'counter',
+        'Запросы, отклоненные ограничениями частоты и параллельности.',
+    ),
+    'pdf_generation_seconds': (
+        'histogram',
+        'Время формирования pdf со списком покупок.',
+    ),
+}
+PREFIX = 'foodgram_'
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Registry:
+    """Метрики текущего процесса.
+
+    При заданном `METRICS_DIR` каждый процесс периодически сбрасывает свои
+    значения в файл `metrics_<pid>.json` этого каталога, а эндпоинт метрик
+    суммирует файлы всех воркеров gunicorn. Изменения сбрасываются и
+    фоновым потоком, чтобы простаивающий воркер не придерживал последний
+    интервал до следующего запроса.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = defaultdict(float)
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        self.flushed = 0.0
+        self.dirty = False
+        self.flusher_pid = None
+
+    def inc(self, name: str, labels: Dict[str, str], value=1) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] += value
+            self.dirty = True
+
+    def observe(self, name: str, labels: Dict[str, str], value) -> None:
+        """Добавление значения в гистограмму.
+
+        Гистограмма хранится как список счетчиков по `LATENCY_BUCKETS`,
+        за которыми следуют сумма и количество наблюдений.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.setdefault(
+                key,
+                [0] * (len(LATENCY_BUCKETS) + 2),
+            )
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+            self.dirty = True
+
+    def dump(self) -> Dict[str, list]:
+        with self.lock:
+            return to_dump(self.counters, self.histograms)
+
+    def flush(self, force: bool = False) -> None:
+        """Сохранение метрик процесса в общий каталог."""
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force:
+            self.start_flusher()
+            if now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+                return
+        self.flushed = now
+        self.dirty = False
+        write_dump(metrics_path(directory, os.getpid()), self.dump())
+
+    def start_flusher(self) -> None:
+        """Запуск фонового сброса метрик в текущем процессе.
+
+        Потоки не переживают fork, поэтому поток запускается заново в
+        каждом воркере.
+        """
+        if self.flusher_pid == os.getpid():
+            return
+        self.flusher_pid = os.getpid()
+        threading.Thread(target=self.run_flusher, daemon=True).start()
+
+    def run_flusher(self) -> None:
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            if self.dirty:
+                self.flush(force=True)
+
+
+def to_dump(counters, histograms) -> Dict[str, list]:
+    return {
+        'counters': [
+            [name, list(labels), value]
+            for (name, labels), value in counters.items()
+        ],
+        'histograms': [
+            [name, list(labels), list(values)]
+            for (name, labels), values in histograms.items()
+        ],
+    }
+
+
+def metrics_path(directory: str, pid) -> str:
+    return os.path.join(directory, f'metrics_{pid}.json')
+
+
+def write_dump(path: str, dump: Dict[str, list]) -> None:
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(dump, f)
+    os.replace(f'{path}.tmp', path)
+
+
+def read_dump(path: str) -> Optional[Dict[str, list]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+registry = Registry()
+atexit.register(registry.flush, force=True)
+
+
+def inc(name: str, labels: Dict[str, str], value=1) -> None:
+    registry.inc(name, labels, value)
+
+
+def observe(name: str, labels: Dict[str, str], value) -> None:
+    registry.observe(name, labels, value)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Учет попадания или промаха кэша `cache`."""
+    registry.inc(
+        'cache_requests_total',
+        {'cache': cache, 'result': 'hit' if hit else 'miss'},
+    )
+
+
+@contextmanager
+def timer(name: str, **labels: str) -> Iterator[None]:
+    """Замер времени выполнения блока в гистограмму `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(name, labels, time.perf_counter() - start)
+
+
+def collect() -> Dict[str, list]:
+    """Сумма метрик текущего процесса и остальных воркеров.
+
+    Returns:
+        Словарь со списками счетчиков и гистограмм.
+
+    """
+    dumps = [registry.dump()]
+    directory = settings.METRICS_DIR
+    own = f'metrics_{os.getpid()}.json'
+    if directory and os.path.isdir(directory):
+        for file in os.listdir(directory):
+            if file == own or not file.endswith('.json'):
+                continue
+            dump = read_dump(os.path.join(directory, file))
+            if dump is not None:
+                dumps.append(dump)
+    return merge(dumps)
+
+
+def merge(dumps: Iterable[Dict[str, list]]) -> Dict[str, dict]:
+    """Сумма счетчиков и гистограмм нескольких процессов."""
+    counters = defaultdict(float)
+    histograms = {}
+    for dump in dumps:
+        for name, labels, value in dump['counters']:
+            counters[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, values in dump['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            if key in histograms:
+                histograms[key] = [
+                    a + b for a, b in zip(histograms[key], values)
+                ]
+            else:
+                histograms[key] = values
+    return {'counters': counters, 'histograms': histograms}
+
+
+def mark_process_dead(directory: str, pid: int) -> None:
+    """Перенос метрик завершившегося воркера в общий архив.
+
+    Вызывается мастером gunicorn после выхода воркера, поэтому архив
+    пишет один процесс, а настройки Django не нужны. Счетчики воркера
+    сохраняются, а его файл не копится в `METRICS_DIR`.
+    """
+    path = metrics_path(directory, pid)
+    dump = read_dump(path)
+    if dump is None:
+        return
+    archive = metrics_path(directory, 'archive')
+    merged = merge(filter(None, [read_dump(archive), dump]))
+    write_dump(archive, to_dump(merged['counters'], merged['histograms']))
+    os.remove(path)
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', r'\\').replace('"', r'\"'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def render_histogram(name: str, labels: Labels, values: List[float]):
+    for bound, count in zip(
+        (*LATENCY_BUCKETS, '+Inf'),
+        (*values[:len(LATENCY_BUCKETS)], values[-1]),
+    ):
+        bucket = format_labels((*labels, ('le', str(bound))))
+        yield f'{PREFIX}{name}_bucket{bucket} {count}'
+    yield f'{PREFIX}{name}_sum{format_labels(labels)} {values[-2]}'
+    yield f'{PREFIX}{name}_count{format_labels(labels)} {values[-1]}'
+
+
+def render_cache_ratio(counters: Dict[Tuple[str, Labels], float]):
+    hits = defaultdict(lambda: [0.0, 0.0])
+    for (metric, labels), value in counters.items():
+        if metric == 'cache_requests_total':
+            labels = dict(labels)
+            hits[labels['cache']][labels['result'] == 'hit'] += value
+    yield f'# HELP {PREFIX}cache_hit_ratio Доля попаданий в кэш.'
+    yield f'# TYPE {PREFIX}cache_hit_ratio gauge'
+    for cache, (misses, hit) in sorted(hits.items()):
+        labels = format_labels((('cache', cache),))
+        yield f'{PREFIX}cache_hit_ratio{labels} {hit / (hit + misses)}'
+
+
+def render() -> str:
+    """Метрики в текстовом формате Prometheus.
+
+    Returns:
+        Текст для ответа эндпоинта метрик.
+
+    """
+    data = collect()
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f'# HELP {PREFIX}{name} {description}')
+        lines.append(f'# TYPE {PREFIX}{name} {kind}')
+        if kind == 'counter':
+            lines.extend(
+                f'{PREFIX}{name}{format_labels(labels)} {value}'
+                for (metric, labels), value in sorted(data['counters'].items())
+                if metric == name
+            )
+            continue
+        for (metric, labels), values in sorted(data['histograms'].items()):
+            if metric == name:
+                lines.extend(render_histogram(name, labels, values))
+    lines.extend(render_cache_ratio(data['counters']))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,331 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest, HttpResponse
+from django.middleware.gzip import GZipMiddleware
+from rest_framework.authentication import get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+from api import metrics
+from api.authentication import CachedTokenAuthentication
+from foodgram.db_router import use_primary
+
+logger = logging.getLogger('foodgram.performance')
+
+
+class QueryStats:
+    """Количество и суммарное время запросов к БД в рамках запроса."""
+
+    __slots__ = ('count', 'duration')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    'query_stats',
+    default=None,
+)
+
+
+def record_query(execute, sql, params, many, context):
+    """Обертка `execute_wrapper`, учитывающая запросы в `QueryStats`.
+
+    Статистика хранится в контекстной переменной, поэтому учитываются и
+    запросы, выполненные в пуле потоков через `sync_to_async`.
+    """
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.duration += time.perf_counter() - start
+
+
+def install_query_tracking(sender, connection, **kwargs) -> None:
+    """Подключение `record_query` к каждому новому соединению с БД."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Подсчет запросов к БД внутри блока.
+
+    Вложенные блоки используют общую статистику внешнего блока.
+    """
+    stats = _query_stats.get()
+    if stats is not None:
+        yield stats
+        return
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+class HybridMiddleware:
+    """Основа для middleware, работающих и через WSGI, и через ASGI.
+
+    Синхронная middleware в ASGI-стеке заставляет Django выполнять всю
+    последующую цепочку в одном общем потоке, поэтому замеры реализованы
+    в обоих вариантах.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.is_async:
+            return self.acall(request)
+        with track_queries() as stats:
+            start = time.perf_counter()
+            response = self.get_response(request)
+            self.process(request, response, stats, start)
+        return response
+
+    async def acall(self, request: HttpRequest) -> HttpResponse:
+        with track_queries() as stats:
+            start = time.perf_counter()
+            response = await self.get_response(request)
+            self.process(request, response, stats, start)
+        return response
+
+    def process(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+        stats: QueryStats,
+        start: float,
+    ) -> None:
+        """Обработка ответа вьюхи, по умолчанию ничего не делает.
+
+        Args:
+            request: Объект запроса.
+            response: Ответ вьюхи.
+            stats: Статистика запросов к БД за время обработки.
+            start: Время начала обработки по `time.perf_counter`.
+
+        """
+
+
+class ServerTimingMiddleware(HybridMiddleware):
+    """Замер времени обработки запроса с заголовком `Server-Timing`.
+
+    Для доли запросов `PERFORMANCE_SAMPLE_RATE` в ответ добавляется
+    заголовок с временем работы БД, вьюхи, рендеринга и общим временем,
+    а в лог `foodgram.performance` пишется строка в формате JSON.
+    """
+
+    def __init__(self, get_response: Callable) -> None:
+        super().__init__(get_response)
+        self.sample_rate = settings.PERFORMANCE_SAMPLE_RATE
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        request.timing_sampled = random.random() < self.sample_rate
+        if request.timing_sampled:
+            request.timing_start = time.perf_counter()
+        return super().__call__(request)
+
+    def process(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+        stats: QueryStats,
+        start: float,
+    ) -> None:
+        if not request.timing_sampled:
+            return
+        total = time.perf_counter() - start
+        view = getattr(request, 'timing_view', total)
+        timings = {
+            'db': (stats.duration, f'{stats.count} queries'),
+            'view': (view, None),
+            'render': (total - view, None),
+            'total': (total, None),
+        }
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration * 1000:.2f}'
+            + (f';desc="{desc}"' if desc else '')
+            for name, (duration, desc) in timings.items()
+        )
+        logger.info(
+            json.dumps(
+                {
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'db_queries': stats.count,
+                    'db_ms': round(stats.duration * 1000, 2),
+                    'view_ms': round(view * 1000, 2),
+                    'render_ms': round((total - view) * 1000, 2),
+                    'total_ms': round(total * 1000, 2),
+                },
+            ),
+        )
+
+    def process_template_response(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+    ) -> HttpResponse:
+        """Отметка окончания работы вьюхи перед рендерингом ответа DRF."""
+        if hasattr(request, 'timing_start'):
+            request.timing_view = time.perf_counter() - request.timing_start
+        return response
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """Сбор метрик по маршрутам для эндпоинта `/api/metrics`."""
+
+    def process(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+        stats: QueryStats,
+        start: float,
+    ) -> None:
+        duration = time.perf_counter() - start
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        labels = {'route': route, 'method': request.method}
+        metrics.observe('http_request_duration_seconds', labels, duration)
+        metrics.inc(
+            'http_responses_total',
+            {**labels, 'status': str(response.status_code)},
+        )
+        metrics.inc('db_queries_total', labels, stats.count)
+        metrics.registry.flush()
+
+
+def pin_key(user_id: int) -> str:
+    return f'db-pin:{user_id}'
+
+
+def pin_to_primary(user_id: int) -> None:
+    """Чтение пользователя из основной базы `REPLICA_PIN_SECONDS` секунд."""
+    cache.set(pin_key(user_id), 1, settings.REPLICA_PIN_SECONDS)
+
+
+class ReplicaRoutingMiddleware(HybridMiddleware):
+    """Разрешение чтения с реплик для безопасных запросов.
+
+    После изменяющего запроса пользователь на `REPLICA_PIN_SECONDS` секунд
+    закрепляется за основной базой, чтобы видеть собственные изменения,
+    пока они не дошли до реплик. Закрепление привязано к id пользователя:
+    адрес за nginx общий для всех клиентов, а заголовок `Authorization`
+    меняется после входа. Вход и регистрация закрепляют пользователя
+    сигналами, запросы анонимов всегда читают с реплик.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response: Callable) -> None:
+        super().__init__(get_response)
+        if len(settings.DATABASES) < 2:
+            raise MiddlewareNotUsed
+
+    @staticmethod
+    def get_user_id(request: HttpRequest) -> Optional[int]:
+        """Пользователь запроса по токену из заголовка или по сессии.
+
+        DRF проверяет токен только во вьюхе, поэтому здесь он проверяется
+        заранее по основной базе, а результат сохраняется в
+        `request.token_auth` и повторно не проверяется.
+        """
+        header = get_authorization_header(request).split()
+        if len(header) == 2 and header[0].lower() == b'token':
+            try:
+                request.token_auth = (
+                    CachedTokenAuthentication().authenticate_credentials(
+                        header[1].decode(),
+                    )
+                )
+            except (AuthenticationFailed, UnicodeError):
+                return None
+            return request.token_auth[0].pk
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.pk
+        return None
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if request.method in self.SAFE_METHODS:
+            user_id = self.get_user_id(request)
+            use_primary.set(
+                user_id is not None
+                and cache.get(pin_key(user_id)) is not None,
+            )
+        else:
+            use_primary.set(True)
+        return super().__call__(request)
+
+    def process(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+        stats: QueryStats,
+        start: float,
+    ) -> None:
+        user = getattr(request, 'user', None)
+        if (
+            request.method not in self.SAFE_METHODS
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user.pk)
+        use_primary.set(True)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Сжатие ответов gzip, начиная с размера `GZIP_MIN_LENGTH` байт.
+
+    Маленькие ответы не сжимаются: выигрыш в размере не окупает время
+    на сжатие. Сжимаются только JSON-ответы API: HTML админки и
+    browsable API содержит CSRF-токен, и его сжатие открывает атаку
+    BREACH.
+    """
+
+    COMPRESSED_PREFIX = '/api/'
+    COMPRESSED_TYPE = 'application/json'
+
+    def process_response(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+    ) -> HttpResponse:
+        if (
+            not request.path.startswith(self.COMPRESSED_PREFIX)
+            or not response.get('Content-Type', '').startswith(
+                self.COMPRESSED_TYPE,
+            )
+            or (
+                not response.streaming
+                and len(response.content) < settings.GZIP_MIN_LENGTH
+            )
+        ):
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,70 @@
+from functools import wraps
+from typing import Callable, Iterable, List
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpRequest, HttpResponse
+from django.urls import URLPattern
+
+
+def run_view(view: Callable, request: HttpRequest, *args, **kwargs):
+    """Вызов синхронной вьюхи в отдельном потоке.
+
+    Соединения с БД у каждого потока свои, поэтому устаревшие соединения
+    закрываются так же, как это делает Django на границах запроса.
+    """
+    close_old_connections()
+    try:
+        return view(request, *args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def offload(view: Callable) -> Callable:
+    """Перенос синхронной вьюхи в пул потоков при работе через ASGI.
+
+    Django по умолчанию выполняет синхронные вьюхи в одном общем потоке,
+    и медленный запрос (pdf, загрузка изображения) блокирует остальные.
+    Обернутая вьюха выполняется через `sync_to_async(thread_sensitive=False)`,
+    поэтому несколько таких запросов обрабатываются воркером параллельно.
+    При работе через WSGI вьюха возвращается без изменений.
+
+    Args:
+        view: Синхронная вьюха.
+
+    Returns:
+        Асинхронная вьюха или исходная вьюха.
+
+    """
+    if not settings.ASYNC_VIEWS:
+        return view
+
+    @wraps(view)
+    async def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        return await sync_to_async(run_view, thread_sensitive=False)(
+            view,
+            request,
+            *args,
+            **kwargs,
+        )
+
+    return wrapper
+
+
+def offload_urls(
+    patterns: Iterable[URLPattern],
+    names: Iterable[str],
+) -> List[URLPattern]:
+    """Применение `offload` к маршрутам с именами из `names`."""
+    return [
+        URLPattern(
+            pattern.pattern,
+            offload(pattern.callback),
+            pattern.default_args,
+            pattern.name,
+        )
+        if pattern.name in names
+        else pattern
+        for pattern in patterns
+    ]
@@ -1,5 +1,124 @@
+import hashlib
+import json
+from functools import cached_property, partial
+from typing import Iterable, Optional
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+from api import metrics
+from api.cache import get_versions
+from api.constant import (
+    COUNT_CACHE_TIMEOUT,
+    COUNT_ESTIMATE_THRESHOLD,
+    USERS_MAX_PAGE_SIZE,
+    USERS_PAGE_SIZE,
+)
 
 
 class LimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class UserPagination(LimitPagination):
+    page_size = USERS_PAGE_SIZE
+    max_page_size = USERS_MAX_PAGE_SIZE
+
+
+def estimate_count(queryset: QuerySet) -> Optional[int]:
+    """Оценка количества строк по плану запроса PostgreSQL.
+
+    Returns:
+        Оценка планировщика или None для других СУБД.
+
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор с оценкой количества объектов для больших таблиц.
+
+    Используется в админке: точный `COUNT(*)` выполняется, только если
+    оценка планировщика не больше `COUNT_ESTIMATE_THRESHOLD`.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate > COUNT_ESTIMATE_THRESHOLD:
+            return estimate
+        return super().count
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор с кэшированием общего количества объектов.
+
+    Количество кэшируется по тексту запроса и версиям `namespaces`,
+    которые увеличиваются сигналами при изменении данных. Если оценка
+    планировщика больше `COUNT_ESTIMATE_THRESHOLD`, точный `COUNT(*)` не
+    выполняется, а в ответе выставляется признак приблизительного
+    количества.
+    """
+
+    def __init__(self, *args, namespaces: Iterable[str] = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.namespaces = namespaces
+        self.approximate = False
+
+    @cached_property
+    def count(self) -> int:
+        if not isinstance(self.object_list, QuerySet):
+            return len(self.object_list)
+        signature = hashlib.sha1(
+            str(self.object_list.query).encode(),
+        ).hexdigest()
+        key = f'count:{get_versions(self.namespaces)}:{signature}'
+        cached = cache.get(key)
+        metrics.record_cache('count', cached is not None)
+        if cached is None:
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and estimate > COUNT_ESTIMATE_THRESHOLD:
+                cached = (estimate, True)
+            else:
+                cached = (self.object_list.count(), False)
+            cache.set(key, cached, COUNT_CACHE_TIMEOUT)
+        count, self.approximate = cached
+        return count
+
+
+class CachedCountPagination(LimitPagination):
+    """Пагинация с кэшированным или приблизительным количеством.
+
+    Вьюха задает `count_namespaces` - версии кэша, от которых зависит
+    количество объектов, или метод `get_count_namespaces`, если версии
+    зависят от запроса.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if hasattr(view, 'get_count_namespaces'):
+            namespaces = view.get_count_namespaces()
+        else:
+            namespaces = getattr(view, 'count_namespaces', ())
+        self.django_paginator_class = partial(
+            CachedCountPaginator,
+            namespaces=namespaces,
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data) -> Response:
+        response = super().get_paginated_response(data)
+        response.data['count_is_approximate'] = self.page.paginator.approximate
+        return response
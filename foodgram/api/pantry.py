@@ -0,0 +1,203 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from api.constant import PANTRY_MAX_CHANGES
+from recipe.models import IngredientsRecipe
+
+VERSION_KEY = 'pantry-index:version'
+
+
+def change_key(version: int) -> str:
+    return f'pantry-index:change:{version}'
+
+
+class PantryIndex:
+    """Инвертированный индекс ингредиент -> отсортированные id рецептов.
+
+    Индекс хранится в памяти процесса в виде массивов `array('q')`.
+    Изменения рецептов в этом процессе применяются к индексу сразу и
+    записываются в журнал в общем кэше: каждое изменение увеличивает
+    версию и сохраняет id рецепта под ключом новой версии. Остальные
+    процессы читают из журнала пропущенные изменения и перечитывают из БД
+    только ингредиенты этих рецептов. Индекс перестраивается целиком,
+    если пропущено больше `PANTRY_MAX_CHANGES` изменений, часть журнала
+    вытеснена из кэша или индекс старше `PANTRY_INDEX_TTL` секунд.
+    Версия начинается с текущего времени в наносекундах, поэтому после
+    вытеснения ключа версии или вызова `invalidate` она уходит далеко
+    вперед и индексы всех процессов перестраиваются.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.postings: Dict[int, array] = {}
+        self.recipes: Dict[int, Tuple[int, ...]] = {}
+        self.version: Optional[int] = None
+        self.built = 0.0
+
+    def build(self) -> None:
+        version = cache.get_or_set(VERSION_KEY, time.time_ns, None)
+        postings = defaultdict(lambda: array('q'))
+        recipes = defaultdict(list)
+        for ingredient_id, recipe_id in (
+            IngredientsRecipe.objects.order_by('ingredient_id', 'recipe_id')
+            .values_list('ingredient_id', 'recipe_id')
+            .iterator(chunk_size=10000)
+        ):
+            postings[ingredient_id].append(recipe_id)
+            recipes[recipe_id].append(ingredient_id)
+        with self.lock:
+            self.postings = dict(postings)
+            self.recipes = {
+                pk: tuple(ingredients) for pk, ingredients in recipes.items()
+            }
+            self.version = version
+            self.built = time.monotonic()
+
+    def ensure_fresh(self) -> None:
+        version = cache.get(VERSION_KEY)
+        if (
+            self.version is None
+            or version is None
+            or not 0 <= version - self.version <= PANTRY_MAX_CHANGES
+            or time.monotonic() - self.built > settings.PANTRY_INDEX_TTL
+        ):
+            self.build()
+        elif version != self.version:
+            self.apply_changes(self.version, version)
+
+    def apply_changes(self, old: int, new: int) -> None:
+        """Применение изменений журнала с версии `old` до `new`.
+
+        Ингредиенты измененных рецептов читаются из БД одним запросом,
+        удаленные рецепты просто убираются из индекса.
+        """
+        keys = [change_key(version) for version in range(old + 1, new + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            self.build()
+            return
+        recipe_ids = set(changes.values())
+        ingredients = defaultdict(list)
+        for recipe_id, ingredient_id in IngredientsRecipe.objects.filter(
+            recipe_id__in=recipe_ids,
+        ).values_list('recipe_id', 'ingredient_id'):
+            ingredients[recipe_id].append(ingredient_id)
+        with self.lock:
+            if self.version != old:
+                return
+            for recipe_id in recipe_ids:
+                self.replace(recipe_id, ingredients.get(recipe_id, ()))
+            self.version = new
+
+    def publish(self, recipe_id: int) -> None:
+        """Запись изменения рецепта в журнал.
+
+        Если индекс процесса был актуален, он остается актуальным и для
+        новой версии, иначе пропущенные изменения (включая это) будут
+        применены при следующем поиске. Место в журнале занимается через
+        `add`: в `DatabaseCache` `incr` не атомарен, и два процесса могут
+        получить одну версию, тогда проигравший берет следующую.
+        """
+        while True:
+            try:
+                new = cache.incr(VERSION_KEY)
+            except ValueError:
+                cache.set(VERSION_KEY, time.time_ns(), None)
+                return
+            if cache.add(
+                change_key(new),
+                recipe_id,
+                settings.PANTRY_INDEX_TTL,
+            ):
+                break
+        with self.lock:
+            if self.version == new - 1:
+                self.version = new
+
+    def invalidate(self) -> None:
+        """Перестроение индексов всех процессов после массовых изменений."""
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+    def replace(self, recipe_id: int, ingredient_ids: Iterable[int]) -> None:
+        """Замена ингредиентов рецепта в индексе процесса."""
+        with self.lock:
+            for ingredient_id in self.recipes.pop(recipe_id, ()):
+                posting = self.postings[ingredient_id]
+                index = bisect_left(posting, recipe_id)
+                if index < len(posting) and posting[index] == recipe_id:
+                    del posting[index]
+            ingredient_ids = tuple(ingredient_ids)
+            if not ingredient_ids:
+                return
+            self.recipes[recipe_id] = ingredient_ids
+            for ingredient_id in ingredient_ids:
+                insort(
+                    self.postings.setdefault(ingredient_id, array('q')),
+                    recipe_id,
+                )
+
+    def remove_recipe(self, recipe_id: int) -> None:
+        self.replace(recipe_id, ())
+        self.publish(recipe_id)
+
+    def update_recipe(
+        self,
+        recipe_id: int,
+        ingredient_ids: Iterable[int],
+    ) -> None:
+        """Замена ингредиентов рецепта в индексе и запись в журнал."""
+        self.replace(recipe_id, ingredient_ids)
+        self.publish(recipe_id)
+
+    def search(
+        self,
+        ingredient_ids: Iterable[int],
+        max_missing: int,
+    ) -> List[Tuple[int, int]]:
+        """Поиск рецептов, которые можно приготовить из ингредиентов.
+
+        Количество совпадений по каждому рецепту считается одним проходом
+        `Counter` по спискам рецептов выбранных ингредиентов.
+
+        Args:
+            ingredient_ids: id имеющихся ингредиентов.
+            max_missing: Допустимое число недостающих ингредиентов.
+
+        Returns:
+            Пары из id рецепта и числа недостающих ингредиентов,
+            отсортированные по числу недостающих и доле покрытия.
+
+        """
+        self.ensure_fresh()
+        with self.lock:
+            counts = Counter(
+                chain.from_iterable(
+                    self.postings[pk]
+                    for pk in set(ingredient_ids)
+                    if pk in self.postings
+                ),
+            )
+            found = [
+                (pk, len(self.recipes[pk]) - matched, matched)
+                for pk, matched in counts.items()
+                if len(self.recipes[pk]) - matched <= max_missing
+            ]
+        found.sort(
+            key=lambda item: (
+                item[1],
+                -item[2] / (item[1] + item[2]),
+                -item[0],
+            ),
+        )
+        return [(pk, missing) for pk, missing, _ in found]
+
+
+pantry_index = PantryIndex()
@@ -1,5 +1,9 @@
+import ipaddress
+
+from django.conf import settings
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 from rest_framework.request import Request
+from rest_framework.throttling import BaseThrottle
 
 from recipe.models import Recipe
 
@@ -19,3 +23,33 @@ class IsUserAdminAuthorOrReadOnly(BasePermission):
 
         """
         return request.method in SAFE_METHODS or obj.author == request.user
+
+
+class IsAdminOrInternalNetwork(BasePermission):
+    """Доступ администраторам или запросам из внутренней сети."""
+
+    def has_permission(self, request: Request, _) -> bool:
+        """Проверка прав пользователя или адреса запроса.
+
+        Args:
+            request: Запрос пользователя.
+
+        Адрес клиента определяется как в ограничениях частоты DRF: за
+        nginx `REMOTE_ADDR` всегда адрес прокси, поэтому адрес берется из
+        `X-Forwarded-For` с учетом `NUM_PROXIES`.
+
+        Returns:
+            True - пользователь администратор или адрес запроса входит в
+            `METRICS_ALLOWED_NETWORKS`, иначе False.
+
+        """
+        if request.user and request.user.is_staff:
+            return True
+        try:
+            address = ipaddress.ip_address(BaseThrottle().get_ident(request))
+        except ValueError:
+            return False
+        return any(
+            address in ipaddress.ip_network(network)
+            for network in settings.METRICS_ALLOWED_NETWORKS
+        )
@@ -0,0 +1,43 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Рендерер JSON на orjson, если библиотека установлена.
+
+    Типы, которые orjson не сериализует сам (Decimal, ленивые строки,
+    даты), передаются в кодировщик DRF, поэтому ответ совпадает с
+    `JSONRenderer`. Без orjson и для запросов с отступами используется
+    стандартный рендерер.
+    """
+
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(
+            accepted_media_type or '',
+            renderer_context or {},
+        ):
+            return super().render(
+                data,
+                accepted_media_type,
+                renderer_context,
+            )
+        ret = orjson.dumps(
+            data,
+            default=self.encoder.default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+        for separator, escaped in LINE_SEPARATORS:
+            ret = ret.replace(separator, escaped)
+        return ret
@@ -1,11 +1,15 @@
 from typing import Any, Dict, List, OrderedDict
 
+from django.db import transaction
 from djoser.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
 from api.constant import MAX_VALUE, MIN_VALUE
+from api.pantry import pantry_index
+from api.tasks import fan_out_recipe_task
+from jobs.queue import enqueue
 from recipe.models import (
     Cart,
     Favorite,
@@ -45,6 +49,8 @@ class CustomUserSerializer(UserSerializer):
             True - пользователь подписан на автора, иначе False.
 
         """
+        if hasattr(obj, 'subscribed'):
+            return obj.subscribed
         user = self.context['request'].user
         return (
             user.is_authenticated
@@ -247,6 +253,39 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
 
+class AuthorDocumentSerializer(CustomUserSerializer):
+    """Сериализатор автора для документа рецепта без данных пользователя."""
+
+    is_subscribed = None
+
+    class Meta(CustomUserSerializer.Meta):
+        fields = ('email', 'id', 'username', 'first_name', 'last_name')
+
+
+class RecipeDocumentSerializer(RecipeReadSerializer):
+    """Сериализатор общего для всех пользователей документа рецепта.
+
+    Признаки `is_favorited`, `is_in_shopping_cart` и `is_subscribed`
+    зависят от пользователя и добавляются при выдаче.
+    """
+
+    author = AuthorDocumentSerializer()
+    is_favorited = None
+    is_in_shopping_cart = None
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = (
+            'name',
+            'id',
+            'image',
+            'text',
+            'cooking_time',
+            'author',
+            'tags',
+            'ingredients',
+        )
+
+
 class IngredientsRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для модели `IngredientsRecipe`."""
 
@@ -367,6 +406,10 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         ]
         IngredientsRecipe.objects.bulk_create(ingredients)
         recipe.tags.set(tags)
+        ingredient_ids = [link.ingredient_id for link in ingredients]
+        transaction.on_commit(
+            lambda: pantry_index.update_recipe(recipe.pk, ingredient_ids),
+        )
 
     def create(self, validated_data: Dict[str, Any]) -> Recipe:
         """Метод для создания рецепта.
@@ -386,6 +429,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             **validated_data,
         )
         self.create_tags_ingredients(recipe, ingredients, tags)
+        enqueue(fan_out_recipe_task, recipe_id=recipe.pk)
         return recipe
 
     def update(self, recipe: Recipe, validated_data: Dict[str, Any]) -> Recipe:
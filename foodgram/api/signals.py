@@ -0,0 +1,207 @@
+from django.contrib.auth.signals import user_logged_in
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from djoser.signals import user_registered
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache_key
+from api.cache import bump_version_on_commit
+from api.documents import (
+    forget_cached_documents,
+    mark_deleting,
+    schedule_rebuild,
+    unmark_deleting,
+)
+from api.feed import change_followers_count
+from api.middleware import pin_to_primary
+from api.pantry import pantry_index
+from recipe.models import (
+    Cart,
+    Favorite,
+    Ingredient,
+    IngredientsRecipe,
+    Recipe,
+    Tag,
+)
+from users.models import Follow, User
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance: Token, **kwargs) -> None:
+    cache.delete(token_cache_key(instance.key))
+
+
+def only_last_login(update_fields) -> bool:
+    return bool(update_fields) and set(update_fields) == {'last_login'}
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance: User, created: bool, **kwargs):
+    """Сброс кэша токенов при изменении пользователя.
+
+    Обновление только `last_login` при входе кэш не сбрасывает.
+    """
+    if created or only_last_login(kwargs.get('update_fields')):
+        return
+    cache.delete_many(
+        [
+            token_cache_key(key)
+            for key in Token.objects.filter(user=instance).values_list(
+                'key',
+                flat=True,
+            )
+        ],
+    )
+
+
+@receiver(user_logged_in)
+@receiver(user_registered)
+def pin_new_session_to_primary(sender, user: User, **kwargs) -> None:
+    """Закрепление за основной базой после входа и регистрации.
+
+    Следующий запрос придет уже с новым токеном, которого еще может не
+    быть на репликах.
+    """
+    pin_to_primary(user.pk)
+
+
+@receiver(pre_delete, sender=Recipe)
+def skip_deleted_recipe_document(sender, instance: Recipe, **kwargs):
+    mark_deleting(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_pantry_index(sender, instance: Recipe, **kwargs):
+    recipe_id = instance.pk
+    transaction.on_commit(lambda: pantry_index.remove_recipe(recipe_id))
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_deleted_recipe(sender, instance: Recipe, **kwargs) -> None:
+    unmark_deleting(instance.pk)
+    forget_cached_documents([instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipes_version(sender, **kwargs) -> None:
+    bump_version_on_commit('recipes')
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def bump_favorites_version(sender, instance: Favorite, **kwargs) -> None:
+    bump_version_on_commit(f'favorites:{instance.user_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follows_version(sender, **kwargs) -> None:
+    bump_version_on_commit('follows')
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follower(sender, instance: Follow, created: bool, **kwargs):
+    if created:
+        change_followers_count(instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_lost_follower(sender, instance: Follow, **kwargs) -> None:
+    change_followers_count(instance.author_id, -1)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tags_version(sender, **kwargs) -> None:
+    bump_version_on_commit('tags')
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_ingredients_version(sender, **kwargs) -> None:
+    bump_version_on_commit('ingredients', 'shopping-ingredients')
+
+
+@receiver(post_save, sender=IngredientsRecipe)
+@receiver(post_delete, sender=IngredientsRecipe)
+def bump_shopping_ingredients_version(sender, **kwargs) -> None:
+    bump_version_on_commit('shopping-ingredients')
+
+
+@receiver(post_save, sender=Cart)
+@receiver(post_delete, sender=Cart)
+def bump_cart_version(sender, instance: Cart, **kwargs) -> None:
+    bump_version_on_commit(f'cart:{instance.user_id}')
+
+
+@receiver(post_save, sender=Recipe)
+def rebuild_recipe_document(sender, instance: Recipe, **kwargs) -> None:
+    schedule_rebuild([instance.pk])
+
+
+@receiver(post_save, sender=IngredientsRecipe)
+@receiver(post_delete, sender=IngredientsRecipe)
+def rebuild_ingredients_document(sender, instance, **kwargs) -> None:
+    schedule_rebuild([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def rebuild_tags_document(sender, instance, action, reverse, pk_set, **kwargs):
+    """Пересборка документов при изменении тэгов рецепта.
+
+    При очистке тэгов со стороны тэга затронутые рецепты запоминаются до
+    удаления связей.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            schedule_rebuild([instance.pk])
+    elif action == 'pre_clear':
+        instance.document_recipes = list(
+            instance.recipes.values_list('pk', flat=True),
+        )
+    elif action in ('post_add', 'post_remove'):
+        schedule_rebuild(pk_set)
+    elif action == 'post_clear':
+        schedule_rebuild(instance.document_recipes)
+
+
+@receiver(post_save, sender=Tag)
+def rebuild_tag_documents(sender, instance: Tag, **kwargs) -> None:
+    schedule_rebuild(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tag_recipes(sender, instance: Tag, **kwargs) -> None:
+    instance.document_recipes = list(
+        instance.recipes.values_list('pk', flat=True),
+    )
+
+
+@receiver(post_delete, sender=Tag)
+def rebuild_deleted_tag_documents(sender, instance: Tag, **kwargs) -> None:
+    schedule_rebuild(instance.document_recipes)
+
+
+@receiver(post_save, sender=Ingredient)
+def rebuild_ingredient_documents(sender, instance: Ingredient, **kwargs):
+    if kwargs['created']:
+        return
+    schedule_rebuild(
+        instance.ingredientsrecipe.values_list('recipe_id', flat=True),
+    )
+
+
+@receiver(post_save, sender=User)
+def rebuild_author_documents(sender, instance: User, created: bool, **kwargs):
+    if created or only_last_login(kwargs.get('update_fields')):
+        return
+    schedule_rebuild(instance.recipes.values_list('pk', flat=True))
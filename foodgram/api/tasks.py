@@ -0,0 +1,23 @@
+from api.feed import backfill_feed, fan_out_recipe
+from jobs.queue import task
+from recipe.models import Recipe
+from users.models import Follow
+
+
+@task
+def fan_out_recipe_task(recipe_id: int) -> None:
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is not None:
+        fan_out_recipe(recipe)
+
+
+@task
+def backfill_feed_task(user_id: int, author_id: int) -> None:
+    """Заполнение ленты, если подписка еще существует."""
+    follow = (
+        Follow.objects.filter(user=user_id, author=author_id)
+        .select_related('user', 'author')
+        .first()
+    )
+    if follow is not None:
+        backfill_feed(follow.user, follow.author)
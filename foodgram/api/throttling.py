@@ -0,0 +1,166 @@
+import threading
+from typing import Dict, Optional
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from api import metrics
+from api.constant import CONCURRENCY_RETRY_AFTER
+
+
+class ServiceUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервер перегружен, повторите запрос позже.'
+    default_code = 'service_unavailable'
+
+    def __init__(self, wait: int) -> None:
+        super().__init__()
+        self.wait = wait
+
+
+def get_scope(view) -> Optional[str]:
+    """Область ограничений текущего действия вьюхи из `throttle_scopes`."""
+    return getattr(view, 'throttle_scopes', {}).get(
+        getattr(view, 'action', None),
+    )
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """Ограничение частоты запросов скользящим окном со счетчиками.
+
+    В кэше хранятся только счетчики текущего и предыдущего окна, а
+    число запросов за последние `duration` секунд оценивается как сумма
+    текущего счетчика и доли предыдущего. Частота задается в
+    `DEFAULT_THROTTLE_RATES` ключом `<область>_<suffix>`, пустое значение
+    отключает ограничение.
+    """
+
+    suffix = None
+
+    def __init__(self) -> None:
+        self.wait_seconds = None
+
+    def get_ident_key(self, request) -> Optional[str]:
+        """Ключ клиента для счетчиков, None - запрос не ограничивается."""
+        return None
+
+    def allow_request(self, request, view) -> bool:
+        scope = get_scope(view)
+        if scope is None:
+            return True
+        self.scope = f'{scope}_{self.suffix}'
+        self.rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if not self.rate:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        ident = self.get_ident_key(request)
+        if ident is None:
+            return True
+        self.key = self.cache_format % {'scope': self.scope, 'ident': ident}
+        now = self.timer()
+        window = int(now // self.duration)
+        current_key = f'{self.key}:{window}'
+        previous_key = f'{self.key}:{window - 1}'
+        counts = self.cache.get_many([current_key, previous_key])
+        current = counts.get(current_key, 0)
+        previous = counts.get(previous_key, 0)
+        elapsed = now - window * self.duration
+        weight = 1 - elapsed / self.duration
+        if current + previous * weight >= self.num_requests:
+            self.wait_seconds = self.get_wait(current, previous, elapsed)
+            metrics.inc(
+                'rejected_requests_total',
+                {'scope': self.scope, 'reason': 'throttle'},
+            )
+            return False
+        if not self.cache.add(current_key, 1, self.duration * 2):
+            try:
+                self.cache.incr(current_key)
+            except ValueError:
+                self.cache.set(current_key, 1, self.duration * 2)
+        return True
+
+    def get_wait(self, current: int, previous: int, elapsed: float):
+        """Время, через которое оценка опустится ниже лимита."""
+        if current >= self.num_requests or not previous:
+            return self.duration - elapsed
+        return max(
+            self.duration * (1 - (self.num_requests - current) / previous)
+            - elapsed,
+            0,
+        )
+
+    def wait(self) -> Optional[float]:
+        return self.wait_seconds
+
+
+class UserScopeThrottle(SlidingWindowThrottle):
+    """Ограничение по авторизованному пользователю."""
+
+    suffix = 'user'
+
+    def get_ident_key(self, request) -> Optional[str]:
+        if request.user and request.user.is_authenticated:
+            return str(request.user.pk)
+        return None
+
+
+class IPScopeThrottle(SlidingWindowThrottle):
+    """Ограничение по адресу клиента, в том числе анонимного."""
+
+    suffix = 'ip'
+
+    def get_ident_key(self, request) -> str:
+        return self.get_ident(request)
+
+
+class ConcurrencyLimiter:
+    """Ограничение числа одновременных дорогих запросов в процессе.
+
+    Лимиты задаются настройкой `CONCURRENCY_LIMITS` по областям
+    `throttle_scopes`, область без лимита не ограничивается.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.semaphores: Dict[str, threading.BoundedSemaphore] = {}
+
+    def get_semaphore(self, scope: str):
+        limit = settings.CONCURRENCY_LIMITS.get(scope)
+        if not limit:
+            return None
+        with self.lock:
+            if scope not in self.semaphores:
+                self.semaphores[scope] = threading.BoundedSemaphore(limit)
+            return self.semaphores[scope]
+
+    def acquire(self, scope: Optional[str]) -> bool:
+        """Занятие места для запроса области `scope`.
+
+        Returns:
+            True, если место занято и его нужно освободить через
+            `release`, иначе False.
+
+        Raises:
+            ServiceUnavailable: Все места области заняты.
+
+        """
+        semaphore = self.get_semaphore(scope) if scope else None
+        if semaphore is None:
+            return False
+        if not semaphore.acquire(blocking=False):
+            metrics.inc(
+                'rejected_requests_total',
+                {'scope': scope, 'reason': 'concurrency'},
+            )
+            raise ServiceUnavailable(wait=CONCURRENCY_RETRY_AFTER)
+        return True
+
+    def release(self, scope: str) -> None:
+        self.semaphores[scope].release()
+
+
+concurrency_limiter = ConcurrencyLimiter()
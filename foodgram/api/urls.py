@@ -1,10 +1,13 @@
 from django.urls import include, path
 from rest_framework import routers
 
+from api.offload import offload_urls
 from api.views import (
+    CustomUserViewSet,
     FollowApiView,
     FollowListApiView,
     IngredientReadView,
+    MetricsView,
     RecipeViewSet,
     TagReadView,
 )
@@ -13,6 +16,13 @@ router = routers.DefaultRouter()
 router.register(r'recipes', RecipeViewSet)
 router.register(r'tags', TagReadView)
 router.register(r'ingredients', IngredientReadView)
+router.register(r'users', CustomUserViewSet)
+
+OFFLOADED_VIEWS = (
+    'recipe-list',
+    'recipe-detail',
+    'recipe-download-shopping-cart',
+)
 
 urlpatterns = [
     path(
@@ -25,7 +35,7 @@ urlpatterns = [
         FollowListApiView.as_view(),
         name='subscriptions',
     ),
-    path('', include(router.urls)),
-    path('', include('djoser.urls')),
+    path('metrics', MetricsView.as_view(), name='metrics'),
+    path('', include(offload_urls(router.urls, OFFLOADED_VIEWS))),
     path('auth/', include('djoser.urls.authtoken')),
 ]
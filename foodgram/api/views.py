@@ -1,23 +1,50 @@
+import hashlib
 import io
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 from django.core.handlers.wsgi import WSGIRequest
-from django.db.models import Sum
-from django.http import FileResponse
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Sum, Value
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
+from djoser.views import UserViewSet
 from rest_framework import generics, status, views, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-
-from api.filters import IngredientFilter, RecipeFilter
-from api.paginators import LimitPagination
-from api.permissions import IsUserAdminAuthorOrReadOnly
+from rest_framework.utils.urls import replace_query_param
+
+from api import metrics
+from api.cache import cached
+from api.constant import (
+    FEED_MAX_PAGE_SIZE,
+    FEED_PAGE_SIZE,
+    PANTRY_MAX_MISSING,
+    RECIPE_IDS_MAX,
+)
+from api.documents import (
+    deferred_rebuild,
+    document_cache_key,
+    get_documents,
+    get_user_document,
+    overlay_user_flags,
+)
+from api.feed import (
+    clear_feed,
+    decode_cursor,
+    encode_cursor,
+    read_feed,
+)
+from api.filters import IngredientFilter, RecipeFilter, UserFilter
+from api.paginators import CachedCountPagination, UserPagination
+from api.pantry import pantry_index
+from api.permissions import (
+    IsAdminOrInternalNetwork,
+    IsUserAdminAuthorOrReadOnly,
+)
 from api.serializers import (
     CartSerializer,
     FavoriteSerializer,
@@ -28,6 +55,9 @@ from api.serializers import (
     RecipeReadSerializer,
     TagSerializer,
 )
+from api.tasks import backfill_feed_task
+from api.throttling import concurrency_limiter, get_scope
+from jobs.queue import enqueue
 from recipe.models import (
     Cart,
     Favorite,
@@ -39,6 +69,19 @@ from recipe.models import (
 from users.models import Follow, User
 
 
+@lru_cache(maxsize=None)
+def register_pdf_font() -> None:
+    """Импорт reportlab и регистрация шрифта при первой выгрузке pdf.
+
+    reportlab нужен только для списка покупок, поэтому он не загружается
+    при старте воркера.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    pdfmetrics.registerFont(TTFont('Verdana', 'data/Verdana.ttf', 'UTF-8'))
+
+
 class FollowApiView(views.APIView):
     serializer_class = FollowsSerializer
     permission_classes = (IsAuthenticated,)
@@ -54,15 +97,21 @@ class FollowApiView(views.APIView):
             Возвращает статус об успешном создании объекта/плохой реквест.
 
         """
+        author = get_object_or_404(User, id=user_id)
         serializer = self.serializer_class(
             data={
                 'user': request.user.id,
-                'author': get_object_or_404(User, id=user_id).pk,
+                'author': author.pk,
             },
             context={'request': request},
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        enqueue(
+            backfill_feed_task,
+            user_id=request.user.pk,
+            author_id=author.pk,
+        )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def delete(self, request: WSGIRequest, user_id: int) -> Response:
@@ -79,6 +128,7 @@ class FollowApiView(views.APIView):
         """
         author = get_object_or_404(User, id=user_id)
         user = request.user
+        clear_feed(user, author)
         if Follow.objects.filter(user=user.id, author=author.id).delete():
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_400_BAD_REQUEST)
@@ -86,22 +136,121 @@ class FollowApiView(views.APIView):
 
 class FollowListApiView(generics.ListAPIView):
     serializer_class = FollowResultSerializer
-    pagination_class = LimitPagination
+    pagination_class = CachedCountPagination
+    count_namespaces = ('follows',)
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        return User.objects.filter(following__user=self.request.user)
+        return User.objects.filter(
+            following__user=self.request.user,
+        ).annotate(subscribed=Value(True))
+
+
+class CustomUserViewSet(UserViewSet):
+    """Пользователи с постраничным выводом и поиском по началу имени.
+
+    Признак подписки вычисляется в запросе списка подзапросом `EXISTS`,
+    а не отдельным запросом для каждого пользователя.
+    """
+
+    pagination_class = UserPagination
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = UserFilter
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = super().get_queryset()
+        if not user.is_authenticated:
+            return queryset.annotate(subscribed=Value(False))
+        return queryset.annotate(
+            subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef('pk')),
+            ),
+        )
+
+
+class MetricsView(views.APIView):
+    permission_classes = (IsAdminOrInternalNetwork,)
+
+    def get(self, request: WSGIRequest) -> HttpResponse:
+        """Метод для выдачи метрик в формате Prometheus.
 
+        Args:
+            request: Объект запроса.
+
+        Returns:
+            Возвращает метрики всех воркеров в текстовом формате.
+
+        """
+        return HttpResponse(
+            metrics.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
 
-class TagReadView(viewsets.ReadOnlyModelViewSet):
+
+def get_tags_data() -> List[Dict[str, Any]]:
+    return cached(
+        'tags:list',
+        lambda: TagSerializer(Tag.objects.all(), many=True).data,
+        namespaces=('tags',),
+        name='tags',
+    )
+
+
+def get_ingredients_data(name: str = '') -> List[Dict[str, Any]]:
+    """Каталог ингредиентов или результаты поиска по началу названия."""
+    return cached(
+        'ingredients:list:' + hashlib.sha1(name.encode()).hexdigest(),
+        lambda: IngredientSerializer(
+            IngredientFilter(
+                {'name': name},
+                queryset=Ingredient.objects.all(),
+            ).qs,
+            many=True,
+        ).data,
+        namespaces=('ingredients',),
+        name='ingredients',
+    )
+
+
+class CachedDetailMixin:
+    """Кэширование выдачи объекта справочника с кэшированием отсутствия."""
+
+    cache_namespace = None
+
+    def get_detail_data(self) -> Optional[Dict[str, Any]]:
+        try:
+            return self.get_serializer(self.get_object()).data
+        except Http404:
+            return None
+
+    def retrieve(self, request: WSGIRequest, pk: str) -> Response:
+        if not pk.isdigit():
+            raise NotFound
+        data = cached(
+            f'{self.cache_namespace}:{pk}',
+            self.get_detail_data,
+            namespaces=(self.cache_namespace,),
+            name=self.cache_namespace,
+        )
+        if data is None:
+            raise NotFound
+        return Response(data)
+
+
+class TagReadView(CachedDetailMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для модели `Tag`."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
+    cache_namespace = 'tags'
+
+    def list(self, request: WSGIRequest) -> Response:
+        return Response(get_tags_data())
 
 
-class IngredientReadView(viewsets.ReadOnlyModelViewSet):
+class IngredientReadView(CachedDetailMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для модели `Ingredient`."""
 
     queryset = Ingredient.objects.all()
@@ -109,6 +258,12 @@ class IngredientReadView(viewsets.ReadOnlyModelViewSet):
     permission_classes = (AllowAny,)
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter
+    cache_namespace = 'ingredients'
+
+    def list(self, request: WSGIRequest) -> Response:
+        return Response(
+            get_ingredients_data(request.query_params.get('name', '')),
+        )
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -119,16 +274,170 @@ class RecipeViewSet(viewsets.ModelViewSet):
         .prefetch_related('tags', 'ingredients')
         .all()
     )
-    pagination_class = LimitPagination
+    pagination_class = CachedCountPagination
+    count_namespaces = ('recipes',)
     permission_classes = (IsUserAdminAuthorOrReadOnly,)
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    throttle_scopes = {
+        'list': 'list',
+        'create': 'write',
+        'update': 'write',
+        'partial_update': 'write',
+        'download_shopping_cart': 'pdf',
+        'pantry': 'pantry',
+    }
+
+    def get_count_namespaces(self) -> Tuple[str, ...]:
+        """Версии кэша количества рецептов для текущего запроса.
+
+        Фильтры `is_favorited` и `is_in_shopping_cart` зависят от списков
+        пользователя, поэтому к общей версии рецептов добавляются версии
+        его избранного и корзины. Общая версия от этих списков не зависит.
+        """
+        namespaces = self.count_namespaces
+        user = self.request.user
+        if user.is_authenticated:
+            params = self.request.query_params
+            if params.get('is_favorited'):
+                namespaces += (f'favorites:{user.pk}',)
+            if params.get('is_in_shopping_cart'):
+                namespaces += (f'cart:{user.pk}',)
+        return namespaces
+
+    def initial(self, request, *args, **kwargs):
+        """Проверки запроса и занятие места для дорогого действия."""
+        super().initial(request, *args, **kwargs)
+        scope = get_scope(self)
+        if concurrency_limiter.acquire(scope):
+            self.concurrency_scope = scope
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        scope = getattr(self, 'concurrency_scope', None)
+        if scope is not None:
+            self.concurrency_scope = None
+            concurrency_limiter.release(scope)
+        return super().finalize_response(request, response, *args, **kwargs)
 
     def get_serializer_class(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'feed', 'pantry']:
             return RecipeReadSerializer
         return RecipeCreateSerializer
 
+    def get_documents(self, recipe_ids):
+        """Документы рецептов с признаками текущего пользователя."""
+        return overlay_user_flags(
+            get_documents(list(recipe_ids)),
+            self.request,
+        )
+
+    @staticmethod
+    def get_requested_ids(request: WSGIRequest) -> Optional[List[int]]:
+        """Разбор параметра `ids` со списком id рецептов через запятую.
+
+        Returns:
+            id рецептов без повторов в порядке запроса или None, если
+            параметр не передан.
+
+        Raises:
+            ValidationError: Неверный параметр или слишком много id.
+
+        """
+        if 'ids' not in request.query_params:
+            return None
+        try:
+            ids = list(
+                dict.fromkeys(
+                    int(pk)
+                    for pk in request.query_params['ids'].split(',')
+                    if pk
+                ),
+            )
+        except ValueError:
+            raise ValidationError('Неверное значение!')
+        if len(ids) > RECIPE_IDS_MAX:
+            raise ValidationError(
+                f'Можно запросить не более {RECIPE_IDS_MAX} рецептов',
+            )
+        return ids
+
+    def list(self, request: WSGIRequest, *args, **kwargs) -> Response:
+        """Метод для получения списка рецептов.
+
+        Фильтрация и пагинация выполняются по id рецептов, а данные
+        страницы читаются из документов `RecipeDocument`. С параметром
+        `ids` возвращаются рецепты из списка в порядке запроса без
+        пагинации, несуществующие id пропускаются. Если вместе с `ids`
+        переданы фильтры, id из списка, не прошедшие их, тоже
+        пропускаются.
+
+        Args:
+            request: Объект запроса.
+
+        Returns:
+            Возвращает список рецептов.
+
+        """
+        requested = self.get_requested_ids(request)
+        if requested is not None:
+            if request.query_params.keys() & self.filterset_class.base_filters:
+                matched = set(
+                    self.filter_queryset(
+                        Recipe.objects.filter(pk__in=requested),
+                    ).values_list('pk', flat=True),
+                )
+                requested = [pk for pk in requested if pk in matched]
+            return Response(self.get_documents(requested))
+        ids = self.filter_queryset(Recipe.objects.all()).values_list(
+            'pk',
+            flat=True,
+        )
+        page = self.paginate_queryset(ids)
+        if page is not None:
+            return self.get_paginated_response(self.get_documents(page))
+        return Response(self.get_documents(ids))
+
+    def retrieve(self, request: WSGIRequest, pk: int) -> Response:
+        """Метод для получения рецепта из его документа.
+
+        Пользователь получает документ вместе со своими признаками одним
+        запросом, анонимный - документ из кэша без запросов к базе.
+
+        Args:
+            request: Объект запроса.
+            pk: id-рецепта.
+
+        Returns:
+            Возвращает рецепт.
+
+        Raises:
+            NotFound: Рецепт не найден.
+
+        """
+        if not str(pk).isdigit():
+            raise NotFound
+        if request.user.is_authenticated:
+            document = get_user_document(int(pk), request)
+        else:
+            document = cached(
+                document_cache_key(int(pk)),
+                lambda: next(iter(get_documents([int(pk)])), None),
+                name='recipes',
+            )
+        if document is None:
+            raise NotFound
+        if not request.user.is_authenticated:
+            document = overlay_user_flags([document], request)[0]
+        return Response(document)
+
+    def perform_create(self, serializer):
+        with transaction.atomic(), deferred_rebuild():
+            serializer.save()
+
+    def perform_update(self, serializer):
+        with transaction.atomic(), deferred_rebuild():
+            serializer.save()
+
     @staticmethod
     def create_instance(request, pk, serializer):
         """Добавление рецепта в избранное или в корзину.
@@ -214,11 +523,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @staticmethod
     def create_shopping_list(ingredients):
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.units import inch
+        from reportlab.pdfgen import canvas
+
+        register_pdf_font()
         buf = io.BytesIO()
         c = canvas.Canvas(buf, pagesize=letter, bottomup=0)
         text_obj = c.beginText()
         text_obj.setTextOrigin(inch, inch)
-        pdfmetrics.registerFont(TTFont('Verdana', 'data/Verdana.ttf', 'UTF-8'))
         text_obj.setFont('Verdana', 17)
         ing_list = [
             f'{ing["ingredient__name"]} '
@@ -232,6 +545,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
         buf.seek(0)
         return buf
 
+    def build_shopping_list(self, user: User) -> bytes:
+        ingredients = (
+            IngredientsRecipe.objects.filter(recipe__carts__user=user)
+            .values('ingredient__name', 'ingredient__measurement_unit')
+            .annotate(ing_amount=Sum('amount'))
+            .order_by('ingredient__name')
+        )
+        with metrics.timer('pdf_generation_seconds'):
+            return self.create_shopping_list(ingredients).getvalue()
+
     @action(
         detail=False,
         methods=['GET'],
@@ -249,14 +572,99 @@ class RecipeViewSet(viewsets.ModelViewSet):
             Возвращает PDF-файл.
 
         """
-        ingredients = (
-            IngredientsRecipe.objects.filter(recipe__carts__user=request.user)
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .annotate(ing_amount=Sum('amount'))
-            .order_by('ingredient__name')
+        shopping_list = cached(
+            f'shopping-list:{request.user.pk}',
+            lambda: self.build_shopping_list(request.user),
+            namespaces=(f'cart:{request.user.pk}', 'shopping-ingredients'),
+            name='shopping_list',
         )
         return FileResponse(
-            self.create_shopping_list(ingredients),
+            io.BytesIO(shopping_list),
             as_attachment=True,
             filename='ingredients.pdf',
         )
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=[
+            IsAuthenticated,
+        ],
+    )
+    def feed(self, request: WSGIRequest) -> Response:
+        """Метод для получения ленты рецептов авторов из подписок.
+
+        Args:
+            request: Объект запроса.
+
+        Returns:
+            Возвращает страницу ленты и ссылку на следующую страницу.
+
+        """
+        try:
+            limit = min(
+                int(request.query_params.get('limit', FEED_PAGE_SIZE)),
+                FEED_MAX_PAGE_SIZE,
+            )
+        except ValueError:
+            limit = FEED_PAGE_SIZE
+        ids, next_cursor = read_feed(
+            request.user,
+            decode_cursor(request.query_params.get('cursor')),
+            max(limit, 1),
+        )
+        return Response(
+            {
+                'next': replace_query_param(
+                    request.build_absolute_uri(),
+                    'cursor',
+                    encode_cursor(next_cursor),
+                )
+                if next_cursor
+                else None,
+                'results': self.get_documents(ids),
+            },
+        )
+
+    @action(detail=False, methods=['GET'], permission_classes=[AllowAny])
+    def pantry(self, request: WSGIRequest) -> Response:
+        """Метод для подбора рецептов по имеющимся ингредиентам.
+
+        Args:
+            request: Объект запроса с параметрами `ingredients` (id через
+            запятую) и `missing` (допустимое число недостающих).
+
+        Returns:
+            Возвращает рецепты, отсортированные по числу недостающих
+            ингредиентов и доле покрытия.
+
+        Raises:
+            ValidationError: Неверные параметры запроса.
+
+        """
+        try:
+            ingredient_ids = [
+                int(pk)
+                for pk in request.query_params.get('ingredients', '').split(
+                    ',',
+                )
+                if pk
+            ]
+            missing = int(request.query_params.get('missing', 0))
+        except ValueError:
+            raise ValidationError('Неверное значение!')
+        if not ingredient_ids:
+            raise ValidationError('Укажите ингредиенты!')
+        if not 0 <= missing <= PANTRY_MAX_MISSING:
+            raise ValidationError(
+                f'missing должен быть от 0 до {PANTRY_MAX_MISSING}',
+            )
+        found = pantry_index.search(ingredient_ids, missing)
+        page = self.paginate_queryset(found)
+        missing_by_id = dict(found if page is None else page)
+        data = self.get_documents(missing_by_id)
+        for item in data:
+            item['missing'] = missing_by_id[item['id']]
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
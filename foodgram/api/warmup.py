@@ -0,0 +1,54 @@
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+from django.db import connections
+from django.urls import get_resolver
+
+from api.pantry import pantry_index
+from api.views import (
+    get_ingredients_data,
+    get_tags_data,
+    register_pdf_font,
+)
+
+logger = logging.getLogger('foodgram.warmup')
+
+
+def load_urls() -> None:
+    get_resolver().url_patterns
+
+
+WARMUP_STEPS: Dict[str, Callable[[], None]] = {
+    'urls': load_urls,
+    'pdf': register_pdf_font,
+    'pantry_index': pantry_index.ensure_fresh,
+    'tags': get_tags_data,
+    'ingredients': get_ingredients_data,
+}
+
+
+def warmup() -> Dict[str, Optional[float]]:
+    """Загрузка ленивых модулей и кэшей процесса до первых запросов.
+
+    Прогрев необязателен: ошибка шага (недоступны БД или кэш)
+    записывается в лог, а остальные шаги выполняются, и воркер начинает
+    принимать запросы с холодными кэшами.
+
+    Returns:
+        Время выполнения каждого шага в миллисекундах, None для шагов,
+        завершившихся ошибкой.
+
+    """
+    timings = {}
+    for name, step in WARMUP_STEPS.items():
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception('Шаг прогрева %s завершился ошибкой', name)
+            timings[name] = None
+            continue
+        timings[name] = round((time.perf_counter() - start) * 1000, 2)
+    connections.close_all()
+    return timings
@@ -0,0 +1,40 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+use_primary: ContextVar[bool] = ContextVar('use_primary', default=True)
+
+
+class ReplicaRouter:
+    """Разделение чтения и записи между основной БД и репликами.
+
+    Чтение уходит на реплики только когда `ReplicaRoutingMiddleware`
+    разрешила это для текущего запроса, во всех остальных случаях
+    (запись, команды manage.py, недавняя запись пользователя) используется
+    основная база `default`. Таблица `DatabaseCache` всегда читается из
+    основной базы: устаревший кэш на реплике вернул бы сброшенные версии.
+    """
+
+    def __init__(self) -> None:
+        self.replicas = [
+            alias for alias in settings.DATABASES if alias != 'default'
+        ]
+
+    def db_for_read(self, model, **hints) -> str:
+        if (
+            use_primary.get()
+            or not self.replicas
+            or model._meta.app_label == 'django_cache'
+        ):
+            return 'default'
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints) -> str:
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, **hints) -> bool:
+        return db == 'default'
@@ -11,7 +11,7 @@ SECRET_KEY = os.getenv('SECRET_KEY')
 
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
 
-ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS').split()
+ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost 127.0.0.1').split()
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'api.apps.ApiConfig',
     'recipe.apps.RecipeConfig',
+    'jobs.apps.JobsConfig',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -32,10 +33,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.ServerTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -60,6 +65,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+ASYNC_VIEWS = os.getenv('SERVER_MODE', 'wsgi').lower() == 'asgi'
+
 if os.getenv('SQL'):
     DATABASES = {
         'default': {
@@ -79,6 +86,27 @@ else:
         },
     }
 
+for number, replica in enumerate(os.getenv('DB_REPLICAS', '').split()):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'NAME' if os.getenv('SQL') else 'HOST': replica,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+if len(DATABASES) > 1:
+    DATABASE_ROUTERS = ['foodgram.db_router.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -122,14 +150,50 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
+
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.UserScopeThrottle',
+        'api.throttling.IPScopeThrottle',
+    ],
+
+    'DEFAULT_THROTTLE_RATES': {
+        'pdf_user': os.getenv('THROTTLE_PDF_USER', '10/min'),
+        'pdf_ip': os.getenv('THROTTLE_PDF_IP', '30/min'),
+        'write_user': os.getenv('THROTTLE_WRITE_USER', '30/min'),
+        'write_ip': os.getenv('THROTTLE_WRITE_IP', '60/min'),
+        'list_user': os.getenv('THROTTLE_LIST_USER', '300/min'),
+        'list_ip': os.getenv('THROTTLE_LIST_IP', '600/min'),
+        'pantry_user': os.getenv('THROTTLE_PANTRY_USER', '60/min'),
+        'pantry_ip': os.getenv('THROTTLE_PANTRY_IP', '120/min'),
+    },
+
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+GZIP_MIN_LENGTH = int(os.getenv('GZIP_MIN_LENGTH', 1024))
+
+JOBS_ENABLED = os.getenv('JOBS_ENABLED', 'False').lower() == 'true'
+
+CONCURRENCY_LIMITS = {
+    'pdf': int(os.getenv('CONCURRENCY_PDF', 2)),
+    'write': int(os.getenv('CONCURRENCY_WRITE', 4)),
 }
 
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', 300))
+
+PANTRY_INDEX_TTL = int(os.getenv('PANTRY_INDEX_TTL', 300))
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'HIDE_USERS': False,
@@ -142,3 +206,35 @@ DJOSER = {
         'user': ['djoser.permissions.CurrentUserOrAdminOrReadOnly'],
     },
 }
+
+PERFORMANCE_SAMPLE_RATE = float(os.getenv('PERFORMANCE_SAMPLE_RATE', 0))
+
+METRICS_DIR = os.getenv('METRICS_DIR')
+
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
+
+METRICS_ALLOWED_NETWORKS = os.getenv(
+    'METRICS_ALLOWED_NETWORKS', '127.0.0.1/32 ::1/128',
+).split()
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'foodgram.jobs': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
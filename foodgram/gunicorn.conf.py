@@ -0,0 +1,33 @@
+import os
+
+bind = '0.0.0.0:8000'
+
+if os.getenv('SERVER_MODE', 'wsgi').lower() == 'asgi':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+
+
+def post_worker_init(worker):
+    """Прогрев воркера до того, как он начнет принимать запросы.
+
+    Ошибка прогрева только записывается в лог: воркер, который не
+    загрузился, gunicorn перезапускает, а при повторных ошибках
+    останавливает весь сервис.
+    """
+    try:
+        from api.warmup import warmup
+
+        worker.log.info('Прогрев воркера: %s', warmup())
+    except Exception:
+        worker.log.exception('Прогрев воркера не выполнен')
+
+
+def child_exit(server, worker):
+    """Перенос метрик завершившегося воркера в общий архив."""
+    directory = os.getenv('METRICS_DIR')
+    if directory:
+        from api.metrics import mark_process_dead
+
+        mark_process_dead(directory, worker.pid)
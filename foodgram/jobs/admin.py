@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from jobs.models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at')
+    list_filter = ('status',)
+    search_fields = ('name',)
+    readonly_fields = ('locked_at', 'last_error', 'created')
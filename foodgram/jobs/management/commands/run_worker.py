@@ -0,0 +1,103 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, connections
+
+from jobs import queue
+
+BATCH_SIZE = 10
+POLL_INTERVAL = 1.0
+STALE_CHECK_INTERVAL = 60
+
+
+class Worker:
+    """Цикл выполнения задач одного процесса воркера."""
+
+    def __init__(self, batch_size: int, poll_interval: float, once: bool):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.once = once
+        self.stopping = False
+
+    def stop(self, *args) -> None:
+        self.stopping = True
+
+    def __call__(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        connections.close_all()
+        checked = 0.0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - checked > STALE_CHECK_INTERVAL:
+                queue.release_stale()
+                checked = time.monotonic()
+            jobs = queue.claim(self.batch_size)
+            for job in jobs:
+                queue.run(job)
+            if not jobs:
+                if self.once:
+                    return
+                time.sleep(self.poll_interval)
+
+
+class Command(BaseCommand):
+    """Воркер очереди фоновых задач `Job`.
+
+    Каждый процесс пула независимо забирает задачи из базы, поэтому
+    воркеры можно запускать и на нескольких машинах.
+    """
+
+    help = 'Запуск воркера фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=POLL_INTERVAL,
+            help='Пауза в секундах, если задач нет.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            options['batch_size'],
+            options['poll_interval'],
+            options['once'],
+        )
+        self.stdout.write(
+            f'Воркер запущен, процессов: {options["processes"]}, '
+            f'задач: {len(queue.TASKS)}',
+        )
+        if options['processes'] > 1 and connection.vendor == 'sqlite':
+            self.stderr.write(
+                'SQLite не поддерживает параллельную запись, '
+                'задачи будут чаще повторяться из-за блокировок',
+            )
+        if options['processes'] <= 1:
+            worker()
+            return
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=worker)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        signal.signal(
+            signal.SIGTERM,
+            lambda *args: [process.terminate() for process in processes],
+        )
+        for process in processes:
+            try:
+                process.join()
+            except KeyboardInterrupt:
+                process.join()
@@ -0,0 +1,54 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(verbose_name='Задача', max_length=200)
+    payload = models.JSONField(verbose_name='Аргументы', default=dict)
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попытки', default=0,
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток', default=5,
+    )
+    run_at = models.DateTimeField(
+        verbose_name='Время запуска', default=timezone.now,
+    )
+    locked_at = models.DateTimeField(
+        verbose_name='Время захвата', null=True, blank=True,
+    )
+    last_error = models.TextField(verbose_name='Последняя ошибка', blank=True)
+    created = models.DateTimeField(
+        verbose_name='Дата создания', auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ('run_at',)
+        indexes = (
+            models.Index(
+                fields=('status', 'run_at'),
+                name='job_status_run_at_idx',
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.name} ({self.status})'
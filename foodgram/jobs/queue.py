@@ -0,0 +1,186 @@
+import logging
+import random
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from jobs.models import Job
+
+BACKOFF_SECONDS = 10
+MAX_BACKOFF_SECONDS = 3600
+LOCK_TIMEOUT = timedelta(minutes=10)
+HEARTBEAT_INTERVAL = LOCK_TIMEOUT / 4
+
+logger = logging.getLogger('foodgram.jobs')
+
+TASKS: Dict[str, Callable[..., Any]] = {}
+
+
+def task(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Регистрация функции как фоновой задачи.
+
+    Задачи объявляются в модулях `tasks` приложений, которые
+    импортируются при запуске, и вызываются с аргументами из `payload`.
+    Задача должна быть идемпотентной: после падения воркера или ошибки
+    она выполняется повторно, в том числе если часть работы уже сделана.
+    """
+    TASKS[f'{func.__module__}.{func.__name__}'] = func
+    return func
+
+
+def enqueue(
+    func: Callable[..., Any],
+    run_at: Optional[datetime] = None,
+    **payload: Any,
+) -> Optional[Job]:
+    """Постановка задачи в очередь.
+
+    Задача записывается в текущей транзакции и становится видна
+    воркеру только после ее коммита. При выключенной очереди
+    (`JOBS_ENABLED`) задача выполняется сразу.
+
+    Args:
+        func: Функция, зарегистрированная декоратором `task`.
+        run_at: Время, раньше которого задачу не запускать.
+        payload: Аргументы задачи, сериализуемые в JSON.
+
+    Returns:
+        Созданная задача или None, если она выполнена сразу.
+
+    """
+    name = f'{func.__module__}.{func.__name__}'
+    if name not in TASKS:
+        raise ValueError(f'Задача {name} не зарегистрирована')
+    if not settings.JOBS_ENABLED:
+        func(**payload)
+        return None
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def release_stale() -> int:
+    """Возврат в очередь задач, захваченных упавшими воркерами.
+
+    Воркер продлевает захват выполняющейся задачи каждые
+    `HEARTBEAT_INTERVAL`, поэтому захват старше `LOCK_TIMEOUT` означает,
+    что воркер завис или упал.
+    """
+    return Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=timezone.now() - LOCK_TIMEOUT,
+    ).update(status=Job.QUEUED, locked_at=None)
+
+
+def claim(batch_size: int) -> List[Job]:
+    """Захват готовых к запуску задач.
+
+    В PostgreSQL задачи выбираются `SELECT ... FOR UPDATE SKIP LOCKED`,
+    поэтому воркеры не ждут друг друга. В SQLite задача захватывается
+    условным `UPDATE`, который проходит только у одного воркера.
+
+    Returns:
+        Задачи, захваченные этим воркером.
+
+    """
+    now = timezone.now()
+    ready = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by(
+        'run_at',
+    )
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            jobs = list(ready.select_for_update(skip_locked=True)[:batch_size])
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=Job.RUNNING,
+                locked_at=now,
+            )
+        return jobs
+    return [
+        job
+        for job in ready[:batch_size]
+        if Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            locked_at=now,
+        )
+    ]
+
+
+class Heartbeat(threading.Thread):
+    """Продление захвата задачи, пока она выполняется."""
+
+    def __init__(self, job_id: int) -> None:
+        super().__init__(daemon=True)
+        self.job_id = job_id
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        try:
+            while not self.stopped.wait(HEARTBEAT_INTERVAL.total_seconds()):
+                try:
+                    Job.objects.filter(
+                        pk=self.job_id,
+                        status=Job.RUNNING,
+                    ).update(locked_at=timezone.now())
+                except DatabaseError:
+                    logger.exception(
+                        'Не удалось продлить захват задачи %s',
+                        self.job_id,
+                    )
+        finally:
+            connection.close()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+
+def get_backoff(attempts: int) -> timedelta:
+    """Экспоненциальная задержка перед повтором со случайным разбросом."""
+    delay = min(BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.5))
+
+
+def run(job: Job) -> None:
+    """Выполнение задачи с повтором при ошибке.
+
+    Задача, исчерпавшая `max_attempts` попыток, помечается как
+    завершившаяся ошибкой и больше не запускается. Незарегистрированная
+    задача тоже повторяется: ее может знать воркер новой версии.
+    """
+    job.attempts += 1
+    heartbeat = Heartbeat(job.pk)
+    heartbeat.start()
+    try:
+        if job.name not in TASKS:
+            raise LookupError(f'Задача {job.name} не зарегистрирована')
+        with transaction.atomic():
+            TASKS[job.name](**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            logger.exception('Задача %s завершилась ошибкой', job.pk)
+        else:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + get_backoff(job.attempts)
+    else:
+        job.status = Job.DONE
+    finally:
+        heartbeat.stop()
+    job.locked_at = None
+    job.save(
+        update_fields=(
+            'status',
+            'attempts',
+            'run_at',
+            'locked_at',
+            'last_error',
+        ),
+    )
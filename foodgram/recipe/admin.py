@@ -1,5 +1,10 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Count
 
+from api.documents import deferred_rebuild
+from api.paginators import EstimatedCountPaginator
+from api.pantry import pantry_index
 from recipe.models import (
     Cart,
     Favorite,
@@ -14,15 +19,30 @@ class IngredientsRecipeInLine(admin.TabularInline):
     model = IngredientsRecipe
     extra = 1
     min_num = 1
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ('name', 'author', 'favorite', 'ingredients_name')
-    search_fields = ('name',)
-    list_filter = ('author', 'name', 'tags')
+    list_select_related = ('author',)
+    search_fields = ('name', 'author__username', 'author__email')
+    list_filter = ('tags',)
     filter_horizontal = ('tags',)
     inlines = (IngredientsRecipeInLine,)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(favorites_count=Count('favorites'))
+            .prefetch_related('ingredients')
+        )
 
     def ingredients_name(self, recipe):
         return ', '.join(
@@ -32,9 +52,27 @@ class RecipeAdmin(admin.ModelAdmin):
     ingredients_name.short_description = 'Ингредиенты'
 
     def favorite(self, recipe):
-        return recipe.favorites.count()
+        return recipe.favorites_count
 
     favorite.short_description = 'Количество в избранном'
+    favorite.admin_order_field = 'favorites_count'
+
+    def changeform_view(self, *args, **kwargs):
+        with transaction.atomic(), deferred_rebuild():
+            return super().changeform_view(*args, **kwargs)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        recipe_id = form.instance.pk
+        ingredient_ids = list(
+            form.instance.ingredientsrecipe.values_list(
+                'ingredient_id',
+                flat=True,
+            ),
+        )
+        transaction.on_commit(
+            lambda: pantry_index.update_recipe(recipe_id, ingredient_ids),
+        )
 
 
 @admin.register(Tag)
@@ -47,26 +85,27 @@ class TagAdmin(admin.ModelAdmin):
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit')
-    list_filter = ('name',)
-    search_fields = ('name',)
+    list_filter = ('measurement_unit',)
+    search_fields = ('^name',)
 
 
 @admin.register(IngredientsRecipe)
 class IngredientsRecipeAdmin(admin.ModelAdmin):
     list_display = ('id', 'ingredient', 'recipe', 'amount')
-    list_filter = ('ingredient', 'recipe')
-    search_fields = ('ingredient', 'recipe')
+    list_select_related = ('ingredient', 'recipe')
+    autocomplete_fields = ('ingredient', 'recipe')
+    search_fields = ('ingredient__name', 'recipe__name')
 
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
-    list_filter = ('recipe', 'user')
-    search_fields = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name')
 
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
-    list_filter = ('recipe', 'user')
-    search_fields = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name')
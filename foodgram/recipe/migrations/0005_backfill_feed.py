@@ -0,0 +1,38 @@
+from django.db import migrations
+
+FEED_BACKFILL = 50
+BATCH_SIZE = 1000
+
+
+def backfill_feed(apps, schema_editor):
+    Follow = apps.get_model('users', 'Follow')
+    Recipe = apps.get_model('recipe', 'Recipe')
+    FeedEntry = apps.get_model('recipe', 'FeedEntry')
+    batch = []
+    for user_id, author_id in Follow.objects.values_list(
+        'user_id', 'author_id',
+    ).iterator():
+        batch.extend(
+            FeedEntry(user_id=user_id, recipe_id=pk, pub_date=pub_date)
+            for pk, pub_date in Recipe.objects.filter(
+                author_id=author_id,
+            ).order_by('-pub_date').values_list('pk', 'pub_date')[
+                :FEED_BACKFILL
+            ]
+        )
+        if len(batch) >= BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('recipe', '0004_feedentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_feed, migrations.RunPython.noop),
+    ]
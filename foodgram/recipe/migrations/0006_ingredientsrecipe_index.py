@@ -0,0 +1,17 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0005_backfill_feed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredientsrecipe',
+            index=models.Index(fields=['ingredient', 'recipe'], name='ingredient_recipe_idx'),
+        ),
+    ]
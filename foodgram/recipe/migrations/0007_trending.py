@@ -0,0 +1,57 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_created(apps, schema_editor):
+    """Дата добавления старых записей избранного и корзины.
+
+    Настоящая дата неизвестна, поэтому берется дата публикации рецепта,
+    раньше которой запись появиться не могла. Иначе вся накопленная
+    активность считалась бы недавней и завышала популярность.
+    """
+    Recipe = apps.get_model('recipe', 'Recipe')
+    pub_date = Subquery(
+        Recipe.objects.filter(pk=OuterRef('recipe_id')).values('pub_date'),
+    )
+    for name in ('Cart', 'Favorite'):
+        apps.get_model('recipe', name).objects.update(created=pub_date)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0006_ingredientsrecipe_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='created',
+            field=models.DateTimeField(null=True, verbose_name='Дата добавления'),
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(null=True, verbose_name='Дата добавления'),
+        ),
+        migrations.RunPython(backfill_created, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cart',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата добавления'),
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата добавления'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(default=0, verbose_name='Популярность'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending_score', '-pub_date'], name='recipe_trending_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0007_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeDocument',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='recipe.recipe', verbose_name='Рецепт')),
+                ('data', models.JSONField(verbose_name='Представление рецепта')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата сборки')),
+            ],
+            options={
+                'verbose_name': 'Документ рецепта',
+                'verbose_name_plural': 'Документы рецептов',
+            },
+        ),
+    ]
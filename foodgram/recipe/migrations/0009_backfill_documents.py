@@ -0,0 +1,70 @@
+from django.db import migrations
+
+BATCH_SIZE = 500
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+
+
+def build_document(recipe):
+    return {
+        'name': recipe.name,
+        'id': recipe.pk,
+        'image': recipe.image.url if recipe.image else None,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'author': {
+            field: getattr(recipe.author, field) for field in AUTHOR_FIELDS
+        },
+        'tags': [
+            {
+                'name': tag.name,
+                'color': tag.color,
+                'slug': tag.slug,
+                'id': tag.pk,
+            }
+            for tag in recipe.tags.all()
+        ],
+        'ingredients': [
+            {
+                'name': link.ingredient.name,
+                'id': link.ingredient_id,
+                'measurement_unit': link.ingredient.measurement_unit,
+                'amount': link.amount,
+            }
+            for link in recipe.ingredientsrecipe.all()
+        ],
+    }
+
+
+def backfill_documents(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    RecipeDocument = apps.get_model('recipe', 'RecipeDocument')
+    recipe_ids = list(
+        Recipe.objects.filter(document__isnull=True)
+        .order_by('pk')
+        .values_list('pk', flat=True),
+    )
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        recipes = (
+            Recipe.objects.filter(pk__in=recipe_ids[start:start + BATCH_SIZE])
+            .select_related('author')
+            .prefetch_related('tags', 'ingredientsrecipe__ingredient')
+        )
+        RecipeDocument.objects.bulk_create(
+            [
+                RecipeDocument(recipe_id=recipe.pk, data=build_document(recipe))
+                for recipe in recipes
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('recipe', '0008_recipedocument'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
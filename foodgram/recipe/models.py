@@ -75,11 +75,20 @@ class Recipe(models.Model):
         verbose_name='Автор',
     )
     pub_date = models.DateTimeField(verbose_name='Описание', auto_now_add=True)
+    trending_score = models.FloatField(
+        verbose_name='Популярность', default=0,
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-trending_score', '-pub_date'),
+                name='recipe_trending_idx',
+            ),
+        )
 
     def __str__(self) -> str:
         return self.name
@@ -109,6 +118,12 @@ class IngredientsRecipe(models.Model):
     class Meta:
         verbose_name = 'Количество ингридиента'
         verbose_name_plural = 'Количества ингридиентов'
+        indexes = (
+            models.Index(
+                fields=('ingredient', 'recipe'),
+                name='ingredient_recipe_idx',
+            ),
+        )
 
     def __str__(self) -> str:
         return f'{self.ingredient} - {self.amount}'
@@ -125,6 +140,9 @@ class UserRecipeModel(models.Model):
         verbose_name='Рецепт',
         on_delete=models.CASCADE,
     )
+    created = models.DateTimeField(
+        verbose_name='Дата добавления', auto_now_add=True, db_index=True,
+    )
 
     class Meta:
         abstract = True
@@ -156,3 +174,57 @@ class Favorite(UserRecipeModel):
             ),
         )
         default_related_name = 'favorites'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        on_delete=models.CASCADE,
+        related_name='feed',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        ordering = ('-pub_date', '-recipe')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'), name='Рецепт уже в ленте',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feed_user_pub_date_idx',
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.recipe} в ленте {self.user}'
+
+
+class RecipeDocument(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='document',
+    )
+    data = models.JSONField(verbose_name='Представление рецепта')
+    updated = models.DateTimeField(verbose_name='Дата сборки', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Документ рецепта'
+        verbose_name_plural = 'Документы рецептов'
+
+    def __str__(self) -> str:
+        return f'Документ {self.recipe_id}'
@@ -0,0 +1,91 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.documents import rebuild_documents
+from recipe.models import Ingredient, IngredientsRecipe, Recipe, Tag
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings):
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='cook',
+        email='cook@example.com',
+        password='Sup3r-secret',
+    )
+
+
+@pytest.fixture
+def another_user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='baker',
+        email='baker@example.com',
+        password='Sup3r-secret',
+    )
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user)
+
+
+@pytest.fixture
+def another_token(another_user):
+    return Token.objects.create(user=another_user)
+
+
+@pytest.fixture
+def user_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def tag():
+    return Tag.objects.create(
+        name='Завтрак',
+        color='#E26C2D',
+        slug='breakfast',
+    )
+
+
+@pytest.fixture
+def ingredient():
+    return Ingredient.objects.create(name='мука', measurement_unit='г')
+
+
+@pytest.fixture
+def make_recipe(another_user, tag, ingredient):
+    """Создание рецепта с тэгом `tag` и ингредиентом `ingredient`."""
+
+    def make_recipe(name='Блины', author=None, tags=None, ingredients=None):
+        recipe = Recipe.objects.create(
+            name=name,
+            text='Смешать и пожарить.',
+            cooking_time=20,
+            image='recipe/images/test.png',
+            author=author or another_user,
+        )
+        recipe.tags.set(tags or [tag])
+        IngredientsRecipe.objects.bulk_create(
+            IngredientsRecipe(recipe=recipe, ingredient=item, amount=100)
+            for item in ingredients or [ingredient]
+        )
+        rebuild_documents([recipe.pk])
+        return recipe
+
+    return make_recipe
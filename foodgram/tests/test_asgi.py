@@ -0,0 +1,108 @@
+import asyncio
+import importlib
+import time
+
+import pytest
+from django.test import AsyncClient, override_settings
+from django.urls import clear_url_caches
+
+import api.urls
+import foodgram.urls
+from api.constant import CONCURRENCY_RETRY_AFTER
+from api.throttling import concurrency_limiter
+from api.views import RecipeViewSet
+
+PDF_DELAY = 0.5
+PDF_URL = '/api/recipes/download_shopping_cart/'
+TAGS_URL = '/api/tags/'
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def reload_urls():
+    importlib.reload(api.urls)
+    importlib.reload(foodgram.urls)
+    clear_url_caches()
+
+
+@pytest.fixture
+def asgi_mode(monkeypatch):
+    """Маршруты как при `SERVER_MODE=asgi` и медленная сборка pdf."""
+
+    def build_shopping_list(self, user):
+        time.sleep(PDF_DELAY)
+        return b'%PDF-1.4'
+
+    monkeypatch.setattr(
+        RecipeViewSet,
+        'build_shopping_list',
+        build_shopping_list,
+    )
+    monkeypatch.setattr(concurrency_limiter, 'semaphores', {})
+    with override_settings(ASYNC_VIEWS=True):
+        reload_urls()
+        yield
+    reload_urls()
+
+
+def get_all(*requests):
+    """Одновременное выполнение запросов `(токен, адрес)`.
+
+    Returns:
+        Пары из ответа и времени от начала до его получения в секундах.
+
+    """
+
+    async def fetch(token, url, started):
+        response = await AsyncClient().get(
+            url,
+            authorization=f'Token {token.key}',
+        )
+        return response, time.perf_counter() - started
+
+    async def main():
+        started = time.perf_counter()
+        return await asyncio.gather(
+            *(fetch(token, url, started) for token, url in requests),
+        )
+
+    return asyncio.run(main())
+
+
+def test_slow_pdf_does_not_block_other_requests(
+    asgi_mode,
+    token,
+    another_token,
+):
+    (first, first_time), (second, second_time), (tags, tags_time) = get_all(
+        (token, PDF_URL),
+        (another_token, PDF_URL),
+        (token, TAGS_URL),
+    )
+    assert [first.status_code, second.status_code, tags.status_code] == [
+        200,
+        200,
+        200,
+    ]
+    assert tags_time < PDF_DELAY, 'Быстрый запрос ждал выгрузки pdf'
+    assert max(first_time, second_time) < 2 * PDF_DELAY, (
+        'Выгрузки pdf выполнялись последовательно'
+    )
+
+
+def test_concurrency_limit_returns_503(
+    asgi_mode,
+    settings,
+    token,
+    another_token,
+):
+    settings.CONCURRENCY_LIMITS = {'pdf': 1}
+    responses = sorted(
+        (response for response, _ in get_all(
+            (token, PDF_URL),
+            (another_token, PDF_URL),
+        )),
+        key=lambda response: response.status_code,
+    )
+    assert [response.status_code for response in responses] == [200, 503]
+    assert responses[1]['Retry-After'] == str(CONCURRENCY_RETRY_AFTER)
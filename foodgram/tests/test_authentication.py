@@ -0,0 +1,43 @@
+import pytest
+from django.core.cache import cache
+
+from api.authentication import token_cache_key
+
+ME_URL = '/api/users/me/'
+
+pytestmark = pytest.mark.django_db
+
+
+def test_token_is_not_cached_in_process_local_cache(user_client, user, token):
+    assert user_client.get(ME_URL).status_code == 200
+    assert cache.get(token_cache_key(token.key)) is None
+    type(user).objects.filter(pk=user.pk).update(is_active=False)
+    assert user_client.get(ME_URL).status_code == 401
+
+
+def test_cached_token_is_forgotten_on_deactivation(
+    monkeypatch,
+    user_client,
+    user,
+    token,
+):
+    monkeypatch.setattr(
+        'api.authentication.is_shared_cache',
+        lambda: True,
+    )
+    assert user_client.get(ME_URL).status_code == 200
+    assert cache.get(token_cache_key(token.key)) is not None
+    user.is_active = False
+    user.save()
+    assert user_client.get(ME_URL).status_code == 401
+
+
+def test_cached_token_is_forgotten_on_logout(monkeypatch, user_client, token):
+    monkeypatch.setattr(
+        'api.authentication.is_shared_cache',
+        lambda: True,
+    )
+    assert user_client.get(ME_URL).status_code == 200
+    assert user_client.post('/api/auth/token/logout/').status_code == 204
+    assert cache.get(token_cache_key(token.key)) is None
+    assert user_client.get(ME_URL).status_code == 401
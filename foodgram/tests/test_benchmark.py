@@ -0,0 +1,8 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+
+@pytest.mark.parametrize('requests', [0, 1])
+def test_too_few_requests_are_rejected(requests):
+    with pytest.raises(CommandError, match='--requests'):
+        call_command('benchmark', requests=requests)
@@ -0,0 +1,74 @@
+import pytest
+from django.core.cache import cache
+
+from api.cache import (
+    bump_version,
+    cached,
+    get_versions,
+    rebuild,
+    version_key,
+)
+from recipe.models import Cart, Favorite
+
+
+def test_evicted_version_does_not_resurrect_old_values():
+    assert cached('key', lambda: 'first', namespaces=('tags',)) == 'first'
+    bump_version('tags')
+    assert cached('key', lambda: 'second', namespaces=('tags',)) == 'second'
+    cache.delete(version_key('tags'))
+    assert cached('key', lambda: 'third', namespaces=('tags',)) == 'third'
+
+
+def test_bump_of_evicted_version_starts_new_version():
+    old = get_versions(['tags'])
+    cache.delete(version_key('tags'))
+    bump_version('tags')
+    assert get_versions(['tags']) != old
+
+
+def test_bump_changes_only_its_namespace():
+    tags, ingredients = get_versions(['tags']), get_versions(['ingredients'])
+    bump_version('tags')
+    assert get_versions(['tags']) != tags
+    assert get_versions(['ingredients']) == ingredients
+
+
+def test_rebuild_releases_its_lock():
+    assert rebuild('key', lambda: 'value', 60) == ('value',)
+    assert cache.get('key:lock') is None
+
+
+def test_rebuild_keeps_lock_taken_by_another_worker():
+    def build():
+        cache.set('key:lock', 'another worker', 30)
+        return 'value'
+
+    assert rebuild('key', build, 60) == ('value',)
+    assert cache.get('key:lock') == 'another worker'
+
+
+def favorited_count(client):
+    response = client.get('/api/recipes/', {'limit': 10, 'is_favorited': 1})
+    assert response.status_code == 200
+    return response.json()['count']
+
+
+@pytest.mark.django_db
+def test_favorites_bump_only_user_namespace(
+    django_capture_on_commit_callbacks,
+    user_client,
+    user,
+    another_user,
+    make_recipe,
+):
+    recipe = make_recipe()
+    recipes_version = get_versions(['recipes'])
+    assert favorited_count(user_client) == 0
+    with django_capture_on_commit_callbacks(execute=True):
+        Favorite.objects.create(user=another_user, recipe=recipe)
+        Cart.objects.create(user=another_user, recipe=recipe)
+    assert favorited_count(user_client) == 0
+    with django_capture_on_commit_callbacks(execute=True):
+        Favorite.objects.create(user=user, recipe=recipe)
+    assert favorited_count(user_client) == 1
+    assert get_versions(['recipes']) == recipes_version
@@ -0,0 +1,69 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from recipe.models import Ingredient
+
+
+def write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content, encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.django_db
+def test_loads_json_and_csv(tmp_path):
+    call_command(
+        'comand',
+        write(
+            tmp_path,
+            'ingredients.json',
+            json.dumps([{'name': ' мука ', 'measurement_unit': 'г'}]),
+        ),
+        write(tmp_path, 'ingredients.csv', 'сахар,г\n'),
+        stdout=StringIO(),
+    )
+    assert sorted(Ingredient.objects.values_list('name', flat=True)) == [
+        'мука',
+        'сахар',
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'rows, message',
+    [
+        ([{'name': 'мука'}], 'запись 2: нет строковых полей measurement_unit'),
+        ([{'name': 'мука', 'measurement_unit': 5}], 'запись 2: нет строковых'),
+        (['мука'], 'запись 2: ожидался объект, получено str'),
+    ],
+)
+def test_malformed_json_row_names_the_row(tmp_path, rows, message):
+    path = write(
+        tmp_path,
+        'ingredients.json',
+        json.dumps([{'name': 'соль', 'measurement_unit': 'г'}, *rows]),
+    )
+    with pytest.raises(CommandError, match=message):
+        call_command('comand', path, stdout=StringIO())
+    assert not Ingredient.objects.exists()
+
+
+@pytest.mark.django_db
+def test_short_csv_row_names_the_row(tmp_path):
+    path = write(tmp_path, 'ingredients.csv', 'соль,г\nмука\n')
+    with pytest.raises(CommandError, match='запись 2'):
+        call_command('comand', path, stdout=StringIO())
+
+
+@pytest.mark.django_db
+def test_invalid_ndjson_line_names_the_line(tmp_path):
+    path = write(
+        tmp_path,
+        'ingredients.ndjson',
+        '{"name": "соль", "measurement_unit": "г"}\n{"name": \n',
+    )
+    with pytest.raises(CommandError, match='строка 2: неверный json'):
+        call_command('comand', path, stdout=StringIO())
@@ -0,0 +1,44 @@
+import pytest
+
+from recipe.models import Tag
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def tags(settings):
+    settings.GZIP_MIN_LENGTH = 10
+    Tag.objects.bulk_create(
+        Tag(name=f'Тэг {number}', color='#E26C2D', slug=f'tag-{number}')
+        for number in range(10)
+    )
+
+
+def test_api_json_is_compressed(client, tags):
+    response = client.get('/api/tags/', HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+
+
+def test_browsable_api_is_not_compressed(client, tags):
+    response = client.get(
+        '/api/tags/',
+        HTTP_ACCEPT='text/html',
+        HTTP_ACCEPT_ENCODING='gzip',
+    )
+    assert response['Content-Type'].startswith('text/html')
+    assert not response.has_header('Content-Encoding')
+
+
+def test_admin_is_not_compressed(client, django_user_model, tags):
+    client.force_login(
+        django_user_model.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='Sup3r-secret',
+            first_name='Админ',
+            last_name='Админов',
+        ),
+    )
+    response = client.get('/admin/', HTTP_ACCEPT_ENCODING='gzip')
+    assert response.status_code == 200
+    assert not response.has_header('Content-Encoding')
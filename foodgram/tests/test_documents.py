@@ -0,0 +1,148 @@
+import importlib
+import json
+
+import pytest
+from django.apps import apps
+from django.db import connection
+from django.db.utils import ConnectionHandler
+from rest_framework.test import APIClient
+
+from api.documents import (
+    build_documents_postgres,
+    postgres_document,
+    postgres_documents_queryset,
+)
+from api.serializers import (
+    IngredientReadSerializer,
+    RecipeDocumentSerializer,
+    TagSerializer,
+)
+from recipe.models import Ingredient, Recipe, RecipeDocument, Tag
+from users.models import Follow
+
+backfill = importlib.import_module('recipe.migrations.0009_backfill_documents')
+
+
+@pytest.fixture
+def postgres():
+    """Соединение PostgreSQL для компиляции запросов без подключения."""
+    handler = ConnectionHandler({
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': 'foodgram',
+        },
+    })
+    return handler['default']
+
+
+def test_postgres_documents_query(postgres):
+    sql, params = (
+        postgres_documents_queryset([1, 2])
+        .query.get_compiler(connection=postgres)
+        .as_sql()
+    )
+    assert sql.count('JSONB_AGG(') == 2
+    assert 'INNER JOIN "users_user"' in sql
+    assert 'ORDER BY U2."name"' in sql
+    assert 'ORDER BY U0."id"' in sql
+    keys = [param for param in params if isinstance(param, str)]
+    assert keys == [
+        *TagSerializer.Meta.fields,
+        *IngredientReadSerializer.Meta.fields,
+    ]
+
+
+@pytest.mark.django_db
+def test_postgres_document_shape_matches_serializer(make_recipe, tag):
+    """Документ из строки запроса совпадает с сериализатором.
+
+    На SQLite массивы `JSONB_AGG` заменяются теми же полями в том же
+    порядке, что и в запросе; сам запрос проверяется на PostgreSQL.
+    """
+    lunch = Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+    sugar = Ingredient.objects.create(name='сахар', measurement_unit='г')
+    recipe = make_recipe(tags=[lunch, tag], ingredients=[sugar])
+    row = Recipe.objects.select_related('author').get(pk=recipe.pk)
+    row.tags_data = list(
+        recipe.tags.order_by('name').values(*TagSerializer.Meta.fields),
+    )
+    row.ingredients_data = [
+        {
+            'name': link.ingredient.name,
+            'id': link.ingredient_id,
+            'measurement_unit': link.ingredient.measurement_unit,
+            'amount': link.amount,
+        }
+        for link in recipe.ingredientsrecipe.order_by('pk')
+    ]
+    assert json.loads(json.dumps(postgres_document(row))) == json.loads(
+        json.dumps(RecipeDocumentSerializer(recipe).data),
+    )
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='JSONB_AGG есть только в PostgreSQL',
+)
+@pytest.mark.django_db
+def test_postgres_documents_match_serializer(make_recipe, tag, ingredient):
+    lunch = Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+    sugar = Ingredient.objects.create(name='сахар', measurement_unit='г')
+    recipe = make_recipe(tags=[lunch, tag], ingredients=[sugar, ingredient])
+    empty = make_recipe(name='Вода', tags=[tag], ingredients=[])
+    documents = build_documents_postgres([recipe.pk, empty.pk])
+    for item in (recipe, empty):
+        assert json.loads(json.dumps(documents[item.pk])) == json.loads(
+            json.dumps(RecipeDocumentSerializer(item).data),
+        )
+
+
+@pytest.mark.django_db
+def test_bulk_created_ingredients_are_in_document(make_recipe, ingredient):
+    recipe = make_recipe()
+    document = RecipeDocument.objects.get(recipe=recipe).data
+    assert [item['id'] for item in document['ingredients']] == [
+        ingredient.pk,
+    ]
+
+
+@pytest.mark.django_db
+def test_missing_document_is_not_written_on_read(make_recipe, ingredient):
+    recipe = make_recipe()
+    RecipeDocument.objects.all().delete()
+    response = APIClient().get(f'/api/recipes/{recipe.pk}/')
+    assert response.status_code == 200
+    assert response.json()['ingredients'][0]['id'] == ingredient.pk
+    assert not RecipeDocument.objects.exists()
+
+
+@pytest.mark.django_db
+def test_backfilled_documents_match_serializer(make_recipe, tag):
+    lunch = Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+    recipe = make_recipe(tags=[lunch, tag])
+    empty = make_recipe(name='Вода', ingredients=[])
+    RecipeDocument.objects.all().delete()
+    backfill.backfill_documents(apps, None)
+    for item in (recipe, empty):
+        assert RecipeDocument.objects.get(recipe=item).data == json.loads(
+            json.dumps(RecipeDocumentSerializer(item).data),
+        )
+
+
+@pytest.mark.django_db
+def test_retrieve_is_one_query(
+    django_assert_num_queries,
+    user,
+    another_user,
+    make_recipe,
+):
+    recipe = make_recipe()
+    Follow.objects.create(user=user, author=another_user)
+    client = APIClient()
+    client.force_authenticate(user)
+    with django_assert_num_queries(1):
+        response = client.get(f'/api/recipes/{recipe.pk}/')
+    data = response.json()
+    assert data['author']['is_subscribed'] is True
+    assert data['is_favorited'] is False
+    assert data['ingredients']
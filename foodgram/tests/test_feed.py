@@ -0,0 +1,109 @@
+import base64
+
+import pytest
+from django.utils import timezone
+
+from api.feed import (
+    backfill_feed,
+    decode_cursor,
+    encode_cursor,
+    followers_count,
+    read_feed,
+)
+from users.models import AuthorStats, Follow
+
+FEED_URL = '/api/recipes/feed/'
+
+
+def encode(value):
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+@pytest.mark.parametrize(
+    'cursor',
+    [
+        None,
+        '',
+        'not base64!',
+        encode('garbage|5'),
+        encode('2024-01-01T00:00:00+00:00|x'),
+        encode('2024-13-45T00:00:00+00:00|5'),
+        encode('no separator'),
+    ],
+)
+def test_invalid_cursor_is_ignored(cursor):
+    assert decode_cursor(cursor) is None
+
+
+def test_cursor_round_trip():
+    cursor = (timezone.now(), 42)
+    assert decode_cursor(encode_cursor(cursor)) == cursor
+
+
+@pytest.mark.django_db
+def test_feed_with_bad_cursor_returns_first_page(
+    user_client,
+    user,
+    another_user,
+    make_recipe,
+):
+    for number in range(3):
+        make_recipe(name=f'Рецепт {number}')
+    Follow.objects.create(user=user, author=another_user)
+    backfill_feed(user, another_user)
+    first_page = user_client.get(FEED_URL, {'limit': 2})
+    response = user_client.get(
+        FEED_URL,
+        {'limit': 2, 'cursor': encode('garbage|5')},
+    )
+    assert response.status_code == 200
+    assert response.json()['results'] == first_page.json()['results']
+    next_page = user_client.get(first_page.json()['next'])
+    assert [recipe['name'] for recipe in next_page.json()['results']] == [
+        'Рецепт 0',
+    ]
+
+
+@pytest.fixture
+def heavy_limit(monkeypatch):
+    monkeypatch.setattr('api.feed.FEED_FANOUT_LIMIT', 1)
+
+
+@pytest.mark.django_db
+def test_followers_count_follows_subscriptions(user, another_user):
+    follow = Follow.objects.create(user=user, author=another_user)
+    assert followers_count(another_user.pk) == 1
+    follow.delete()
+    assert followers_count(another_user.pk) == 0
+
+
+@pytest.mark.django_db
+def test_deleting_author_with_followers(user, another_user):
+    Follow.objects.create(user=user, author=another_user)
+    another_user.delete()
+    assert not AuthorStats.objects.exists()
+
+
+@pytest.mark.django_db
+def test_heavy_author_recipes_are_merged_without_counting(
+    heavy_limit,
+    django_user_model,
+    user,
+    another_user,
+    make_recipe,
+    django_assert_num_queries,
+):
+    third = django_user_model.objects.create_user(
+        username='third',
+        email='third@example.com',
+        password='Sup3r-secret',
+    )
+    Follow.objects.create(user=user, author=another_user)
+    Follow.objects.create(user=third, author=another_user)
+    recipe = make_recipe()
+    with django_assert_num_queries(2) as context:
+        ids, _ = read_feed(user, None, 10)
+    assert ids == [recipe.pk]
+    assert not any(
+        'COUNT(' in query['sql'] for query in context.captured_queries
+    )
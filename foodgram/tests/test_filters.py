@@ -0,0 +1,196 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipe.models import Cart, Favorite, Ingredient, Recipe, Tag
+
+RECIPES_URL = '/api/recipes/'
+LIMIT = 10
+
+
+@pytest.fixture
+def lunch():
+    return Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+
+
+@pytest.fixture
+def recipes(make_recipe, tag, lunch, user):
+    both = make_recipe(name='Блины', tags=[tag, lunch])
+    breakfast = make_recipe(name='Каша', tags=[tag])
+    dinner = make_recipe(name='Суп', tags=[lunch])
+    Favorite.objects.create(user=user, recipe=both)
+    Favorite.objects.create(user=user, recipe=dinner)
+    Cart.objects.create(user=user, recipe=breakfast)
+    return both, breakfast, dinner
+
+
+def names(response):
+    assert response.status_code == 200
+    return sorted(recipe['name'] for recipe in response.json()['results'])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'slugs',
+    [['breakfast'], ['lunch'], ['breakfast', 'lunch'], ['unknown']],
+)
+def test_tags_filter_matches_distinct_join(user_client, recipes, slugs):
+    response = user_client.get(
+        RECIPES_URL,
+        {'tags': slugs, 'limit': LIMIT},
+    )
+    expected = Recipe.objects.filter(tags__slug__in=slugs).distinct()
+    assert names(response) == sorted(recipe.name for recipe in expected)
+    assert response.json()['count'] == expected.count()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'params, lookup',
+    [
+        ({'is_favorited': 1}, 'favorites__user'),
+        ({'is_in_shopping_cart': 1}, 'carts__user'),
+        ({'is_favorited': 1, 'tags': 'lunch'}, 'favorites__user'),
+    ],
+)
+def test_user_filters_match_join(user_client, user, recipes, params, lookup):
+    response = user_client.get(RECIPES_URL, {**params, 'limit': LIMIT})
+    expected = Recipe.objects.filter(**{lookup: user})
+    if 'tags' in params:
+        expected = expected.filter(tags__slug=params['tags'])
+    assert names(response) == sorted(recipe.name for recipe in expected)
+
+
+@pytest.mark.django_db
+def test_tags_filter_does_not_use_distinct(user_client, recipes):
+    with CaptureQueriesContext(connection) as context:
+        response = user_client.get(
+            RECIPES_URL,
+            {'tags': ['breakfast', 'lunch'], 'limit': LIMIT},
+        )
+    assert names(response) == ['Блины', 'Каша', 'Суп']
+    queries = [query['sql'] for query in context.captured_queries]
+    assert not any('DISTINCT' in sql for sql in queries)
+    assert any('EXISTS' in sql for sql in queries)
+
+
+@pytest.mark.django_db
+def test_list_without_tags_does_not_query_tags(user_client, recipes):
+    with CaptureQueriesContext(connection) as context:
+        response = user_client.get(RECIPES_URL, {'limit': LIMIT})
+    assert names(response) == ['Блины', 'Каша', 'Суп']
+    assert not any(
+        Tag._meta.db_table in query['sql']
+        for query in context.captured_queries
+    )
+
+
+@pytest.mark.django_db
+def test_ids_keep_requested_order(user_client, recipes):
+    both, breakfast, dinner = recipes
+    response = user_client.get(
+        RECIPES_URL,
+        {'ids': f'{dinner.pk},{both.pk},{breakfast.pk}'},
+    )
+    assert response.status_code == 200
+    assert [recipe['name'] for recipe in response.json()] == [
+        'Суп',
+        'Блины',
+        'Каша',
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'params, expected',
+    [
+        ({'tags': 'lunch'}, ['Суп', 'Блины']),
+        ({'is_in_shopping_cart': 1}, ['Каша']),
+        ({'is_favorited': 1, 'tags': 'breakfast'}, ['Блины']),
+    ],
+)
+def test_ids_are_filtered(user_client, recipes, params, expected):
+    both, breakfast, dinner = recipes
+    response = user_client.get(
+        RECIPES_URL,
+        {'ids': f'{dinner.pk},{both.pk},{breakfast.pk}', **params},
+    )
+    assert response.status_code == 200
+    assert [recipe['name'] for recipe in response.json()] == expected
+
+
+@pytest.mark.django_db
+def test_ids_are_filtered_by_author(user_client, user, recipes):
+    response = user_client.get(
+        RECIPES_URL,
+        {
+            'ids': ','.join(str(recipe.pk) for recipe in recipes),
+            'author': user.pk,
+        },
+    )
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+@pytest.fixture
+def sugar():
+    return Ingredient.objects.create(name='сахар', measurement_unit='г')
+
+
+@pytest.fixture
+def pantry_recipes(make_recipe, ingredient, sugar):
+    make_recipe(name='Блины', ingredients=[ingredient, sugar])
+    make_recipe(name='Хлеб', ingredients=[ingredient])
+    make_recipe(name='Сироп', ingredients=[sugar])
+
+
+def ingredient_ids(*items):
+    return ','.join(str(item.pk) for item in items)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'params, expected',
+    [
+        ({'ingredients': 'flour'}, ['Блины', 'Хлеб']),
+        ({'ingredients': 'flour,sugar'}, ['Блины']),
+        ({'ingredients': 'flour,flour'}, ['Блины', 'Хлеб']),
+        ({'exclude_ingredients': 'sugar'}, ['Хлеб']),
+        ({'exclude_ingredients': 'flour,sugar'}, []),
+        ({'ingredients': 'flour', 'exclude_ingredients': 'sugar'}, ['Хлеб']),
+        ({'exclude_ingredients': ''}, ['Блины', 'Сироп', 'Хлеб']),
+        ({'exclude_ingredients': 'sugar,'}, ['Хлеб']),
+    ],
+)
+def test_ingredient_filters(
+    user_client,
+    pantry_recipes,
+    ingredient,
+    sugar,
+    params,
+    expected,
+):
+    by_name = {'flour': ingredient, 'sugar': sugar}
+    params = {
+        key: ','.join(
+            str(by_name[name].pk) if name else '' for name in value.split(',')
+        )
+        for key, value in params.items()
+    }
+    response = user_client.get(RECIPES_URL, {**params, 'limit': LIMIT})
+    assert names(response) == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('value', ['abc', '1,abc', '1.5'])
+def test_malformed_exclude_ingredients_is_rejected(
+    user_client,
+    pantry_recipes,
+    value,
+):
+    response = user_client.get(
+        RECIPES_URL,
+        {'exclude_ingredients': value, 'limit': LIMIT},
+    )
+    assert response.status_code == 400
+    assert 'exclude_ingredients' in response.json()
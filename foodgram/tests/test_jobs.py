@@ -0,0 +1,130 @@
+import time
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from jobs import queue
+from jobs.models import Job
+
+CALLS = []
+
+
+@queue.task
+def record_task(value: int) -> None:
+    CALLS.append(value)
+
+
+@queue.task
+def failing_task() -> None:
+    raise RuntimeError('Ошибка задачи')
+
+
+@pytest.fixture
+def jobs_enabled(settings):
+    settings.JOBS_ENABLED = True
+    CALLS.clear()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('skip_locked', [True, False])
+def test_claim_takes_each_job_once(monkeypatch, jobs_enabled, skip_locked):
+    monkeypatch.setattr(
+        connection.features,
+        'has_select_for_update_skip_locked',
+        skip_locked,
+    )
+    created = [queue.enqueue(record_task, value=i) for i in range(3)]
+    queue.enqueue(
+        record_task,
+        run_at=timezone.now() + timedelta(hours=1),
+        value=3,
+    )
+    first = queue.claim(2)
+    second = queue.claim(2)
+    assert queue.claim(2) == []
+    assert [job.pk for job in first + second] == [job.pk for job in created]
+    assert set(
+        Job.objects.filter(status=Job.RUNNING).values_list('pk', flat=True),
+    ) == {job.pk for job in created}
+    for job in first + second:
+        queue.run(job)
+    assert CALLS == [0, 1, 2]
+    assert Job.objects.filter(status=Job.DONE).count() == 3
+
+
+@pytest.mark.django_db
+def test_failed_job_is_retried_until_max_attempts(jobs_enabled):
+    job = queue.enqueue(failing_task)
+    job.max_attempts = 2
+    job.save()
+    [job] = queue.claim(1)
+    queue.run(job)
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == (Job.QUEUED, 1)
+    assert job.run_at > timezone.now()
+    assert 'Ошибка задачи' in job.last_error
+    assert queue.claim(1) == []
+    Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+    [job] = queue.claim(1)
+    queue.run(job)
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == (Job.FAILED, 2)
+
+
+@pytest.mark.django_db
+def test_unknown_task_is_retried_with_error(jobs_enabled):
+    job = Job.objects.create(name='api.tasks.removed_task')
+    [job] = queue.claim(1)
+    queue.run(job)
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == (Job.QUEUED, 1)
+    assert 'api.tasks.removed_task не зарегистрирована' in job.last_error
+
+
+@pytest.mark.django_db
+def test_enqueue_rejects_unregistered_function(jobs_enabled):
+    with pytest.raises(ValueError):
+        queue.enqueue(time.sleep, seconds=1)
+
+
+@pytest.mark.django_db
+def test_release_stale_returns_only_expired_jobs(jobs_enabled):
+    now = timezone.now()
+    stale = Job.objects.create(
+        name='tests.test_jobs.record_task',
+        status=Job.RUNNING,
+        locked_at=now - queue.LOCK_TIMEOUT - timedelta(seconds=1),
+    )
+    running = Job.objects.create(
+        name='tests.test_jobs.record_task',
+        status=Job.RUNNING,
+        locked_at=now,
+    )
+    assert queue.release_stale() == 1
+    stale.refresh_from_db()
+    running.refresh_from_db()
+    assert (stale.status, stale.locked_at) == (Job.QUEUED, None)
+    assert running.status == Job.RUNNING
+
+
+def test_heartbeat_keeps_running_job_locked(transactional_db, monkeypatch):
+    monkeypatch.setattr(
+        queue,
+        'HEARTBEAT_INTERVAL',
+        timedelta(milliseconds=20),
+    )
+    locked_at = timezone.now() - queue.LOCK_TIMEOUT * 2
+    job = Job.objects.create(
+        name='tests.test_jobs.record_task',
+        status=Job.RUNNING,
+        locked_at=locked_at,
+    )
+    heartbeat = queue.Heartbeat(job.pk)
+    heartbeat.start()
+    time.sleep(0.2)
+    heartbeat.stop()
+    job.refresh_from_db()
+    assert job.locked_at > locked_at
+    assert queue.release_stale() == 0
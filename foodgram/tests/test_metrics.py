@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from api import metrics
+
+METRICS_URL = '/api/metrics'
+NGINX = '172.18.0.5'
+
+
+@pytest.fixture
+def docker_network(settings):
+    settings.METRICS_ALLOWED_NETWORKS = ['172.18.0.0/16']
+
+
+@pytest.mark.django_db
+def test_metrics_are_closed_for_clients_behind_proxy(client, docker_network):
+    response = client.get(
+        METRICS_URL,
+        REMOTE_ADDR=NGINX,
+        HTTP_X_FORWARDED_FOR='203.0.113.7',
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_metrics_are_open_for_internal_network(client, docker_network):
+    response = client.get(METRICS_URL, REMOTE_ADDR='172.18.0.9')
+    assert response.status_code == 200
+
+
+@pytest.fixture
+def metrics_dir(settings, tmp_path):
+    settings.METRICS_DIR = str(tmp_path)
+    settings.METRICS_FLUSH_INTERVAL = 0.05
+    return tmp_path
+
+
+def test_idle_worker_flushes_last_interval(metrics_dir):
+    registry = metrics.Registry()
+    registry.inc('http_responses_total', {'status': '200'})
+    registry.flush()
+    registry.inc('http_responses_total', {'status': '200'})
+    registry.flush()
+    time.sleep(0.3)
+    own = metrics.read_dump(
+        metrics.metrics_path(metrics_dir, registry.flusher_pid),
+    )
+    assert own['counters'] == [
+        ['http_responses_total', [['status', '200']], 2],
+    ]
+
+
+def test_dead_worker_metrics_are_archived(metrics_dir):
+    for pid, value in ((101, 1), (102, 2), (101, 3)):
+        metrics.write_dump(
+            metrics.metrics_path(metrics_dir, pid),
+            metrics.to_dump({('db_queries_total', ()): value}, {}),
+        )
+        metrics.mark_process_dead(str(metrics_dir), pid)
+    assert [path.name for path in metrics_dir.iterdir()] == [
+        'metrics_archive.json',
+    ]
+    assert metrics.collect()['counters'][('db_queries_total', ())] == 6
@@ -0,0 +1,18 @@
+import importlib
+
+import pytest
+from django.apps import apps
+
+from recipe.models import Cart, Favorite
+
+trending = importlib.import_module('recipe.migrations.0007_trending')
+
+
+@pytest.mark.django_db
+def test_backfilled_activity_is_not_recent(user, make_recipe):
+    recipe = make_recipe()
+    Favorite.objects.create(user=user, recipe=recipe)
+    Cart.objects.create(user=user, recipe=recipe)
+    trending.backfill_created(apps, None)
+    for model in (Favorite, Cart):
+        assert model.objects.get(user=user).created == recipe.pub_date
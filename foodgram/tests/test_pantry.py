@@ -0,0 +1,118 @@
+import pytest
+from django.core.cache import cache
+
+from api.pantry import PantryIndex, change_key, pantry_index
+from recipe.models import Ingredient
+
+PANTRY_URL = '/api/recipes/pantry/'
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(make_recipe, ingredient):
+    sugar = Ingredient.objects.create(name='сахар', measurement_unit='г')
+    return {
+        'pancakes': make_recipe('Блины', ingredients=[ingredient]),
+        'cookies': make_recipe('Печенье', ingredients=[ingredient, sugar]),
+        'candy': make_recipe('Леденцы', ingredients=[sugar]),
+    }
+
+
+def test_pantry_without_limit_returns_all_matches(
+    client,
+    recipes,
+    ingredient,
+):
+    response = client.get(
+        PANTRY_URL,
+        {'ingredients': ingredient.pk, 'missing': 1},
+    )
+    assert response.status_code == 200
+    assert [(item['name'], item['missing']) for item in response.json()] == [
+        ('Блины', 0),
+        ('Печенье', 1),
+    ]
+
+
+def test_pantry_with_limit_is_paginated(client, recipes, ingredient):
+    response = client.get(
+        PANTRY_URL,
+        {'ingredients': ingredient.pk, 'missing': 1, 'limit': 1},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data['count'] == 2
+    assert [item['name'] for item in data['results']] == ['Блины']
+
+
+def search_ids(index, ingredient, missing=1):
+    return [pk for pk, _ in index.search([ingredient.pk], missing)]
+
+
+def test_other_worker_applies_changes_without_rebuild(
+    recipes,
+    ingredient,
+    make_recipe,
+    django_assert_num_queries,
+):
+    writer, reader = PantryIndex(), PantryIndex()
+    writer.build()
+    reader.build()
+    built = reader.built
+    waffles = make_recipe('Вафли', ingredients=[ingredient])
+    writer.update_recipe(waffles.pk, [ingredient.pk])
+    pancakes = recipes['pancakes'].pk
+    recipes['pancakes'].delete()
+    writer.remove_recipe(pancakes)
+    with django_assert_num_queries(1):
+        found = search_ids(reader, ingredient)
+    assert found == [waffles.pk, recipes['cookies'].pk]
+    assert reader.built == built
+    assert reader.version == writer.version
+
+
+def test_large_gap_rebuilds_index(recipes, ingredient, make_recipe):
+    index = PantryIndex()
+    index.build()
+    waffles = make_recipe('Вафли', ingredients=[ingredient])
+    index.invalidate()
+    assert waffles.pk in search_ids(index, ingredient)
+
+
+def test_evicted_change_rebuilds_index(recipes, ingredient, make_recipe):
+    writer, reader = PantryIndex(), PantryIndex()
+    writer.build()
+    reader.build()
+    waffles = make_recipe('Вафли', ingredients=[ingredient])
+    writer.update_recipe(waffles.pk, [ingredient.pk])
+    cache.delete(change_key(writer.version))
+    assert waffles.pk in search_ids(reader, ingredient)
+
+
+def test_deleted_recipe_leaves_index_after_commit(
+    recipes,
+    ingredient,
+    django_capture_on_commit_callbacks,
+):
+    pancakes = recipes['pancakes'].pk
+    assert pancakes in search_ids(pantry_index, ingredient)
+    with django_capture_on_commit_callbacks(execute=True):
+        recipes['pancakes'].delete()
+        assert pancakes in search_ids(pantry_index, ingredient)
+    assert pancakes not in search_ids(pantry_index, ingredient)
+
+
+def test_pantry_is_throttled(client, settings, recipes, ingredient):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+            'pantry_ip': '1/min',
+        },
+    }
+    params = {'ingredients': ingredient.pk}
+    assert client.get(PANTRY_URL, params).status_code == 200
+    response = client.get(PANTRY_URL, params)
+    assert response.status_code == 429
+    assert 'Retry-After' in response
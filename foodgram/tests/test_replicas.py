@@ -0,0 +1,116 @@
+import time
+
+import pytest
+from django.core.cache.backends.db import DatabaseCache
+from django.db import connections
+from rest_framework.test import APIClient
+
+from foodgram.db_router import ReplicaRouter, use_primary
+from recipe.models import Recipe
+
+PIN_SECONDS = 1
+
+
+@pytest.fixture
+def replicate(transactional_db, settings, monkeypatch, tmp_path):
+    """Вторая SQLite-база в роли реплики основной.
+
+    Returns:
+        Функция, копирующая текущее содержимое основной базы в реплику.
+        Изменения после копирования на реплику не попадают, как при
+        отставании репликации.
+
+    """
+    monkeypatch.setitem(
+        settings.DATABASES,
+        'replica_0',
+        {
+            **settings.DATABASES['default'],
+            'NAME': str(tmp_path / 'replica.sqlite3'),
+        },
+    )
+    settings.DATABASE_ROUTERS = ['foodgram.db_router.ReplicaRouter']
+    settings.REPLICA_PIN_SECONDS = PIN_SECONDS
+
+    def replicate():
+        primary, replica = connections['default'], connections['replica_0']
+        primary.ensure_connection()
+        replica.ensure_connection()
+        primary.connection.backup(replica.connection)
+
+    yield replicate
+    connections['replica_0'].close()
+    del connections['replica_0']
+
+
+def client_for(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def recipe_names(client):
+    response = client.get('/api/recipes/', {'limit': 10})
+    assert response.status_code == 200
+    return [recipe['name'] for recipe in response.json()['results']]
+
+
+def test_reads_go_to_replica(replicate, make_recipe, token):
+    make_recipe(name='Блины')
+    replicate()
+    make_recipe(name='Каша')
+    assert recipe_names(APIClient()) == ['Блины']
+    assert recipe_names(client_for(token)) == ['Блины']
+
+
+def test_reads_after_write_are_pinned_to_primary(
+    replicate,
+    make_recipe,
+    token,
+    another_token,
+):
+    recipe = make_recipe()
+    replicate()
+    client = client_for(token)
+    url = f'/api/recipes/{recipe.pk}/'
+    assert client.post(f'{url}favorite/').status_code == 201
+    assert client.get(url).json()['is_favorited'] is True
+    assert client_for(another_token).get(url).status_code == 200
+    time.sleep(PIN_SECONDS + 0.1)
+    assert client.get(url).json()['is_favorited'] is False
+
+
+def test_reads_after_signup_and_login_are_pinned_to_primary(replicate):
+    replicate()
+    client = APIClient()
+    credentials = {'email': 'new@example.com', 'password': 'Sup3r-secret'}
+    response = client.post(
+        '/api/users/',
+        {
+            **credentials,
+            'username': 'new',
+            'first_name': 'Новый',
+            'last_name': 'Пользователь',
+        },
+    )
+    assert response.status_code == 201
+    user_id = response.json()['id']
+    response = client.post('/api/auth/token/login/', credentials)
+    assert response.status_code == 200
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {response.json()["auth_token"]}',
+    )
+    assert client.get('/api/users/me/').json()['id'] == user_id
+    assert client.get(f'/api/users/{user_id}/').status_code == 200
+
+
+def test_cache_table_is_read_from_primary(replicate):
+    router = ReplicaRouter()
+    token = use_primary.set(False)
+    try:
+        assert router.db_for_read(Recipe) == 'replica_0'
+        assert router.db_for_read(
+            DatabaseCache('django_cache', {}).cache_model_class,
+        ) == 'default'
+    finally:
+        use_primary.reset(token)
@@ -0,0 +1,94 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.constant import CONCURRENCY_RETRY_AFTER
+from api.throttling import SlidingWindowThrottle, concurrency_limiter
+
+RECIPES_URL = '/api/recipes/'
+PDF_URL = '/api/recipes/download_shopping_cart/'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемое время скользящего окна."""
+    now = [0.0]
+    monkeypatch.setattr(SlidingWindowThrottle, 'timer', lambda self: now[0])
+    return now
+
+
+@pytest.fixture
+def rates(settings):
+    def rates(**values):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {
+                **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+                **values,
+            },
+        }
+
+    return rates
+
+
+@pytest.fixture
+def limiter(monkeypatch, settings):
+    settings.CONCURRENCY_LIMITS = {'pdf': 1}
+    monkeypatch.setattr(concurrency_limiter, 'semaphores', {})
+    return concurrency_limiter
+
+
+def statuses(client, count):
+    return [client.get(RECIPES_URL).status_code for _ in range(count)]
+
+
+@pytest.mark.django_db
+def test_user_throttle_returns_429_with_retry_after(
+    clock,
+    rates,
+    user_client,
+):
+    rates(list_user='2/min')
+    clock[0] = 10.0
+    assert statuses(user_client, 2) == [200, 200]
+    response = user_client.get(RECIPES_URL)
+    assert response.status_code == 429
+    assert response['Retry-After'] == '50'
+
+
+@pytest.mark.django_db
+def test_ip_throttle_limits_anonymous_clients(clock, rates, user_client):
+    rates(list_ip='2/min')
+    client = APIClient()
+    assert statuses(client, 3) == [200, 200, 429]
+    assert statuses(user_client, 1) == [429]
+
+
+@pytest.mark.django_db
+def test_previous_window_is_counted_by_its_share(clock, rates, user_client):
+    rates(list_user='2/min')
+    assert statuses(user_client, 2) == [200, 200]
+    clock[0] = 70.0
+    assert statuses(user_client, 1) == [200]
+    response = user_client.get(RECIPES_URL)
+    assert response.status_code == 429
+    assert response['Retry-After'] == '20'
+    clock[0] = 90.5
+    assert statuses(user_client, 1) == [200]
+
+
+@pytest.mark.django_db
+def test_empty_rate_disables_throttle(clock, rates, user_client):
+    rates(list_user='', list_ip='')
+    assert statuses(user_client, 5) == [200] * 5
+
+
+@pytest.mark.django_db
+def test_concurrency_limit_returns_503_with_retry_after(limiter, user_client):
+    assert limiter.acquire('pdf')
+    response = user_client.get(PDF_URL)
+    assert response.status_code == 503
+    assert response['Retry-After'] == str(CONCURRENCY_RETRY_AFTER)
+    limiter.release('pdf')
+    assert user_client.get(PDF_URL).status_code == 200
+    assert limiter.acquire('pdf')
+    limiter.release('pdf')
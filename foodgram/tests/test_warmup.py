@@ -0,0 +1,20 @@
+from django.db.utils import OperationalError
+
+from api import warmup
+
+
+def test_failed_step_does_not_stop_warmup(monkeypatch):
+    calls = []
+
+    def broken():
+        raise OperationalError('no such table')
+
+    monkeypatch.setattr(
+        warmup,
+        'WARMUP_STEPS',
+        {'broken': broken, 'urls': lambda: calls.append('urls')},
+    )
+    timings = warmup.warmup()
+    assert timings['broken'] is None
+    assert timings['urls'] is not None
+    assert calls == ['urls']
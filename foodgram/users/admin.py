@@ -1,9 +1,28 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
+from api.paginators import EstimatedCountPaginator
+from recipe.models import Recipe
 from users.models import Follow, User
 
 
+def count_subquery(queryset, field: str) -> Coalesce:
+    """Количество связанных строк подзапросом без соединения таблиц."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
 @admin.register(User)
 class UserAdmin(UserAdmin):
     list_display = (
@@ -15,21 +34,35 @@ class UserAdmin(UserAdmin):
         'count_recipes',
         'count_followers',
     )
-    list_filter = ('email', 'first_name')
+    list_filter = ('is_staff', 'is_active')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                recipes_count=count_subquery(Recipe.objects, 'author'),
+                follows_count=count_subquery(Follow.objects, 'user'),
+            )
+        )
 
     def count_recipes(self, user):
-        return user.recipes.count()
+        return user.recipes_count
 
     count_recipes.short_description = 'Количество рецептов'
+    count_recipes.admin_order_field = 'recipes_count'
 
     def count_followers(self, user):
-        return user.follower.count()
+        return user.follows_count
 
     count_followers.short_description = 'Количество подписок'
+    count_followers.admin_order_field = 'follows_count'
 
 
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'author')
-    list_filter = ('user', 'author')
-    search_fields = ('user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
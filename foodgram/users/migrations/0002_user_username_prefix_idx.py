@@ -0,0 +1,17 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['username'], name='user_username_prefix_idx', opclasses=('varchar_pattern_ops',)),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.3 on 2026-10-19 10:00
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def backfill_followers_count(apps, schema_editor):
+    Follow = apps.get_model('users', 'Follow')
+    AuthorStats = apps.get_model('users', 'AuthorStats')
+    AuthorStats.objects.bulk_create(
+        AuthorStats(author_id=author_id, followers_count=count)
+        for author_id, count in Follow.objects.values('author')
+        .annotate(count=Count('pk'))
+        .values_list('author', 'count')
+        .iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_username_prefix_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='users.user', verbose_name='Автор')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+        migrations.RunPython(
+            backfill_followers_count,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -22,6 +22,13 @@ class User(AbstractUser):
         ordering = ('username',)
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = (
+            models.Index(
+                fields=('username',),
+                opclasses=('varchar_pattern_ops',),
+                name='user_username_prefix_idx',
+            ),
+        )
 
     def __str__(self) -> str:
         return f'{self.first_name}-{self.last_name}'
@@ -56,3 +63,30 @@ class Follow(models.Model):
 
     def __str__(self) -> str:
         return f'{self.user} подписан {self.author}'
+
+
+class AuthorStats(models.Model):
+    """Счетчики автора, которые дорого считать при чтении.
+
+    Хранятся отдельно от `User`, чтобы сохранение пользователя с
+    устаревшим значением не затирало счетчик.
+    """
+
+    author = models.OneToOneField(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self) -> str:
+        return f'{self.author}: {self.followers_count}'